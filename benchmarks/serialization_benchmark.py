@@ -0,0 +1,101 @@
+"""
+Benchmark: pydantic response serialization vs the fast JSON path, over synthetic query results
+
+Run from the repo root:
+    python -m benchmarks.serialization_benchmark
+"""
+import datetime
+import decimal
+import json
+import random
+import time
+import uuid
+from typing import Callable, Dict, List
+from src.api.responses import ORJSON_AVAILABLE, encode_json
+from src.models.api_models import QueryResponse
+
+
+def make_rows(row_count: int, column_count: int) -> List[Dict]:
+    """
+    Rows with the kinds of values postgres returns: ints, text, numerics, dates, timestamps, uuids
+    """
+    rows = []
+    start = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+    for i in range(row_count):
+        row = {}
+        for c in range(column_count):
+            kind = c % 6
+            if kind == 0:
+                row[f"col_{c}"] = i
+            elif kind == 1:
+                row[f"col_{c}"] = f"country_{random.randint(0, 250)}"
+            elif kind == 2:
+                row[f"col_{c}"] = decimal.Decimal(f"{random.uniform(0, 1e6):.2f}")
+            elif kind == 3:
+                row[f"col_{c}"] = (start + datetime.timedelta(days=i % 9000)).date()
+            elif kind == 4:
+                row[f"col_{c}"] = start + datetime.timedelta(seconds=i)
+            else:
+                row[f"col_{c}"] = uuid.uuid4()
+        rows.append(row)
+    return rows
+
+
+def response_fields(rows: List[Dict]) -> Dict:
+    return dict(
+        question="benchmark question",
+        sql_query="SELECT * FROM benchmark",
+        sql_parameters=None,
+        results=rows,
+        relevant_schema="Table 'benchmark'",
+        confidence_score=0.9,
+        mlflow_run_id="benchmark-run-id"
+    )
+
+
+def pydantic_path(rows: List[Dict]) -> bytes:
+    # Previous behaviour: validate the model, serialize it for the response and again for the cache
+    response = QueryResponse(**response_fields(rows))
+    body = response.model_dump_json().encode("utf-8")
+    response.model_dump_json()
+    return body
+
+
+def fast_path(rows: List[Dict]) -> bytes:
+    # model_construct + one encode, reused for the cache write
+    response = QueryResponse.model_construct(**response_fields(rows))
+    return encode_json(dict(response))
+
+
+def best_of(func: Callable[[List[Dict]], bytes], rows: List[Dict], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(rows)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    random.seed(42)
+    print(f"Encoder: {'orjson' if ORJSON_AVAILABLE else 'json (orjson not installed)'}")
+    print(f"{'shape':<24}{'pydantic (ms)':>16}{'fast (ms)':>12}{'speedup':>10}")
+
+    shapes = {
+        "tall (50000 x 6)": (50_000, 6),
+        "wide (2000 x 120)": (2_000, 120),
+        "small (100 x 6)": (100, 6),
+    }
+    for name, (row_count, column_count) in shapes.items():
+        rows = make_rows(row_count, column_count)
+
+        # Both paths have to produce the same JSON for clients
+        assert json.loads(pydantic_path(rows)) == json.loads(fast_path(rows)), f"{name}: output differs"
+
+        pydantic_time = best_of(pydantic_path, rows, repeats=3)
+        fast_time = best_of(fast_path, rows, repeats=3)
+        print(f"{name:<24}{pydantic_time * 1000:>16.1f}{fast_time * 1000:>12.1f}{pydantic_time / fast_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: per-worker memory and startup time, private schema embeddings vs the shared (mmap'd) index
+
+Each "worker" is a separate process. In private mode every worker holds its own embeddings as python
+lists (what SchemaService builds from the Bedrock responses); in shared mode the leader publishes once
+and workers attach to the memory-mapped generation. Bedrock latency is not included: a private worker
+would additionally make 3 Bedrock calls per table to rebuild its index.
+
+Run from the repo root (Linux, reads /proc):
+    python -m benchmarks.shared_index_benchmark
+"""
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from src.models.database_models import SchemaSnapshot, SchemaTable
+from src.services.shared_index_service import load_snapshot, publish_snapshot, read_current_generation
+
+TABLE_COUNT = 300
+EMBEDDING_DIM = 1536  # amazon.titan-embed-text-v1
+WORKER_COUNT = 4
+
+
+def memory_kb() -> dict:
+    """
+    RSS counts shared pages in every process, PSS splits them between the processes that map them
+    """
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key.lower()] = int(value.split()[0])
+    return usage
+
+
+def make_embedding_payloads():
+    # Bedrock returns embeddings as JSON, so the private path starts from the decoded payloads
+    random.seed(7)
+    return {
+        f"table_{t}_{kind}": json.dumps({"embedding": [random.uniform(-1, 1) for _ in range(EMBEDDING_DIM)]})
+        for t in range(TABLE_COUNT)
+        for kind in ("technical", "semantic")
+    }
+
+
+def make_tables():
+    return {
+        f"table_{t}": SchemaTable(
+            name=f"table_{t}",
+            columns={f"col_{c}": "INTEGER" for c in range(12)},
+            primary_keys=["col_0"],
+            foreign_keys=[],
+            description=f"Table 'table_{t}' with columns: " + ", ".join(f"col_{c} (INTEGER)" for c in range(12)),
+            semantic_description=""
+        )
+        for t in range(TABLE_COUNT)
+    }
+
+
+def touch(snapshot: SchemaSnapshot) -> float:
+    # A find_relevant_schema-like pass, so every embedding page is actually read
+    return sum(float(sum(embedding[:8])) for embedding in snapshot.embeddings.values())
+
+
+def private_worker(payloads, results):
+    before = memory_kb()
+    start = time.perf_counter()
+    embeddings = {key: json.loads(payload)["embedding"] for key, payload in payloads.items()}
+    snapshot = SchemaSnapshot(version="bench", tables=make_tables(), embeddings=embeddings)
+    startup = time.perf_counter() - start
+    touch(snapshot)
+    after = memory_kb()
+    results.put((startup, after["rss"] - before["rss"], after["pss"] - before["pss"]))
+
+
+def shared_worker(index_dir, results):
+    before = memory_kb()
+    start = time.perf_counter()
+    snapshot = load_snapshot(index_dir, read_current_generation(index_dir))
+    startup = time.perf_counter() - start
+    touch(snapshot)
+    # Measure while every worker still has the generation mapped, so PSS is split between them
+    results.put(None)
+    time.sleep(1.0)
+    after = memory_kb()
+    results.put((startup, after["rss"] - before["rss"], after["pss"] - before["pss"]))
+
+
+def run_workers(target, args):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=target, args=args + (results,)) for _ in range(WORKER_COUNT)]
+    for worker in workers:
+        worker.start()
+    measurements = []
+    while len(measurements) < WORKER_COUNT:
+        measurement = results.get()
+        if measurement is not None:
+            measurements.append(measurement)
+    for worker in workers:
+        worker.join()
+    return measurements
+
+
+def report(name, measurements, extra=""):
+    startup = max(m[0] for m in measurements)
+    rss = sum(m[1] for m in measurements) / len(measurements) / 1024
+    pss = sum(m[2] for m in measurements) / len(measurements) / 1024
+    print(f"{name:<10}{startup * 1000:>16.1f}{rss:>16.1f}{pss:>16.1f}  {extra}")
+
+
+def main():
+    payloads = make_embedding_payloads()
+    print(f"{TABLE_COUNT} tables x 2 embeddings x {EMBEDDING_DIM} dims, {WORKER_COUNT} workers")
+    print(f"{'mode':<10}{'startup (ms)':>16}{'RSS/worker MB':>16}{'PSS/worker MB':>16}")
+
+    report("private", run_workers(private_worker, (payloads,)))
+
+    index_dir = tempfile.mkdtemp(dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    try:
+        embeddings = {key: json.loads(payload)["embedding"] for key, payload in payloads.items()}
+        start = time.perf_counter()
+        publish_snapshot(index_dir, SchemaSnapshot(version="bench", tables=make_tables(), embeddings=embeddings))
+        publish_time = time.perf_counter() - start
+
+        report("shared", run_workers(shared_worker, (index_dir,)), f"(leader publish: {publish_time * 1000:.1f} ms)")
+    finally:
+        # Don't leave the generation behind in tmpfs
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
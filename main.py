@@ -1,6 +1,6 @@
 from fastapi import FastAPI
-from src.api.routes import router
-from src.services.schema_service import SchemaService
+from src.api.routes import router, schema_service, schema_watch_service, shared_index_service
+from src.api.profiling import profiling_router, profile_request, profiling_service
 from src.config.validation import validate_environment
 from src.config.logging import setup_logging, get_logger
 import os
@@ -20,8 +20,10 @@ app = FastAPI(
 )
 
 app.include_router(router)
-
-schema_service = SchemaService()
+app.include_router(profiling_router)
+# Only registered when enabled, so normal requests don't pay for the middleware
+if profiling_service.settings.profiling_enabled:
+    app.middleware("http")(profile_request)
 
 
 @app.on_event("startup")
@@ -33,13 +35,31 @@ async def startup_event():
     try:
         logger.info("Application starting...")
         
-        await schema_service.get_schema_info()
+        if profiling_service.settings.loop_lag_monitor_enabled:
+            await profiling_service.start_loop_lag_monitor()
+        
+        if shared_index_service.enabled:
+            # Multi-worker mode: the leader loads and publishes the schema, the other workers attach to it
+            await shared_index_service.start()
+        else:
+            # Load the schema into the same instance the routes use
+            await schema_service.get_schema_info()
         logger.info("Db connection successful")
         logger.info("Application startup was complete")
         
     except Exception as e:
         logger.error(f"Application startup failed: {e}")
         logger.warning("Continuing without schema embeddings...")
+    
+    if not shared_index_service.enabled:
+        await schema_watch_service.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await shared_index_service.stop()
+    await schema_watch_service.stop()
+    await profiling_service.stop_loop_lag_monitor()
 
 
 if __name__ == "__main__":
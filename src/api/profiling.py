@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from src.services.profiling_service import ProfilingService
+
+profiling_router = APIRouter()
+
+profiling_service = ProfilingService()
+
+
+async def profile_request(request: Request, call_next):
+    """
+    Middleware (registered only when profiling is enabled): when the request sends the profiling header,
+    return the cProfile breakdown of handling it (including response serialization) instead of its body.
+    """
+    if not request.headers.get(profiling_service.settings.profiling_header):
+        return await call_next(request)
+
+    profiler = profiling_service.start_request_profile()
+    if profiler is None:
+        return PlainTextResponse("Another profile is already running", status_code=409)
+
+    try:
+        response = await call_next(request)
+        # Drain the body so serialization is part of the profile
+        async for _ in response.body_iterator:
+            pass
+    finally:
+        profile = profiling_service.stop_request_profile(profiler)
+
+    return PlainTextResponse(profile, headers={"X-Profiled-Status": str(response.status_code)})
+
+
+@profiling_router.get("/admin/profile", response_class=PlainTextResponse)
+async def sample_profile(seconds: float = 5.0):
+    """
+
+    This endpoint samples the worker's event loop thread for a number of seconds (capped by PROFILING_MAX_SECONDS).
+    It returns folded stacks that can be fed straight into flamegraph.pl or speedscope.
+
+    """
+    if not profiling_service.settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds must be positive")
+
+    # Sample from a separate thread, so the event loop keeps serving requests while it's profiled
+    folded_stacks = await asyncio.to_thread(profiling_service.sample_stacks, threading.get_ident(), seconds)
+    if folded_stacks is None:
+        raise HTTPException(status_code=409, detail="Another profile is already running")
+    return folded_stacks
@@ -0,0 +1,99 @@
+"""
+Fast JSON responses for large query results
+"""
+import datetime
+import decimal
+import ipaddress
+import json
+import uuid
+from typing import Any
+from fastapi.responses import Response
+from src.config.logging import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    logger.warning("orjson is not installed. Falling back to the standard json encoder.")
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _iso_duration(value: datetime.timedelta) -> str:
+    sign = "-" if value < datetime.timedelta(0) else ""
+    value = abs(value)
+    minutes, seconds = divmod(value.seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if value.microseconds:
+        seconds = f"{seconds}.{value.microseconds:06d}".rstrip("0")
+
+    date_part = f"{value.days}D" if value.days else ""
+    time_part = "".join(
+        f"{amount}{unit}" for amount, unit in ((hours, "H"), (minutes, "M"), (seconds, "S")) if amount
+    )
+    if not date_part and not time_part:
+        return "PT0S"
+    return f"{sign}P{date_part}{'T' + time_part if time_part else ''}"
+
+
+def _iso_datetime(value) -> str:
+    # UTC as "Z", like pydantic and orjson's OPT_UTC_Z
+    formatted = value.isoformat()
+    if formatted.endswith("+00:00"):
+        formatted = formatted[:-6] + "Z"
+    return formatted
+
+
+def _encode_postgres_type(value: Any) -> Any:
+    """
+    Type adapters for the postgres values orjson/json don't handle natively.
+    The output matches what pydantic produced for these types, so clients see the same JSON
+    """
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        return _iso_datetime(value)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return _iso_duration(value)
+    if isinstance(value, (uuid.UUID, ipaddress.IPv4Address, ipaddress.IPv6Address,
+                          ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8", errors="replace")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    # numpy scalars (e.g. similarity scores)
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_json(content: Any) -> bytes:
+    """
+    Encode content to JSON bytes, without any per-row model validation
+
+    """
+    if ORJSON_AVAILABLE:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+        try:
+            return orjson.dumps(content, default=_encode_postgres_type, option=options)
+        except TypeError:
+            # orjson only encodes some tzinfo implementations natively, the adapter handles the rest
+            return orjson.dumps(content, default=_encode_postgres_type, option=options | orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(content, default=_encode_postgres_type, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that accepts already encoded bytes (e.g. from the cache) or encodes with encode_json
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return encode_json(content)
@@ -1,11 +1,22 @@
 import asyncio
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends
 from src.models.api_models import QueryRequest, QueryResponse, HealthResponse
+from src.models.database_models import SqlTemplate
+from src.api.responses import FastJSONResponse, encode_json
 from src.services.cache_service import CacheService
 from src.services.schema_service import SchemaService
 from src.services.bedrock_service import BedrockService
 from src.services.mlflow_service import MLFlowService
+from src.services.example_store_service import ExampleStoreService
+from src.services.template_service import TemplateService
+from src.services.repair_service import SqlRepairError, SqlRepairService
+from src.services.schema_watch_service import SchemaWatchService
+from src.services.shared_index_service import SharedIndexService
 from src.config.prompts import PromptTemplates
+from src.config.logging import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
@@ -14,9 +25,14 @@ cache_service = CacheService()
 schema_service = SchemaService()
 bedrock_service = BedrockService()
 mlflow_service = MLFlowService()
+example_store_service = ExampleStoreService()
+template_service = TemplateService()
+repair_service = SqlRepairService(schema_service, bedrock_service, cache_service)
+schema_watch_service = SchemaWatchService(schema_service, cache_service, example_store_service)
+shared_index_service = SharedIndexService(schema_service, schema_watch_service)
 
 
-@router.post("/query", response_model=QueryResponse)
+@router.post("/query", response_model=QueryResponse, response_class=FastJSONResponse)
 async def query_sql(request: QueryRequest):
     
     """
@@ -27,38 +43,143 @@ async def query_sql(request: QueryRequest):
     with mlflow_service.start_run() as run:
         try:
             
-            cached_result = await cache_service.get_cached_query(request.question)
+            # Everything cached is keyed by schema version, so results built on an old schema are never served
+            schema_version = await schema_service.get_schema_version()
+            cached_result = await cache_service.get_cached_query(request.question, schema_version)
             if cached_result:
-                return cached_result
+                return FastJSONResponse(cached_result)
+            
+            # Questions that only differ in literals reuse a cached parameterised template
+            skeleton, literals = template_service.extract_literals(request.question)
+            template_response = await run_cached_template(
+                request.question, skeleton, literals, schema_version, run.info.run_id
+            )
+            if template_response:
+                return template_response
             
-            relevant_schema, confidence = await schema_service.find_relevant_schema(request.question)
+            question_embedding = (await bedrock_service.get_embedding(request.question)).embedding
             
-            sql_prompt = PromptTemplates.get_sql_prompt(relevant_schema, request.question)
-            sql = await bedrock_service.generate_text(sql_prompt)
+            relevant_schema, confidence = await schema_service.find_relevant_schema(
+                request.question, question_embedding=question_embedding
+            )
             
-            query_result = await schema_service.execute_query(sql)
+            # Skip generation when a near-exact example exists for this schema version
+            exact_example = await example_store_service.find_exact_match(
+                request.question, question_embedding, schema_version
+            )
+            if exact_example:
+                sql = exact_example.sql
+                mlflow_service.log_example_usage(exact_match=True, example_count=1)
+            else:
+                examples = await example_store_service.find_similar_examples(question_embedding, schema_version)
+                sql_prompt = PromptTemplates.get_sql_prompt(relevant_schema, request.question, examples)
+                sql = await bedrock_service.generate_text(sql_prompt)
+                mlflow_service.log_example_usage(exact_match=False, example_count=len(examples))
+            
+            # Examples already ran successfully on this schema version, so only generated sql is validated
+            sql, query_result, repair = await repair_service.execute_with_repair(
+                request.question, sql, relevant_schema, schema_version, validate=not exact_example
+            )
+            mlflow_service.log_repair_metrics(repair.attempts, repair.repair_time, repair.repaired, repair.from_cache)
             
-            response = QueryResponse(
+            # model_construct skips per-row validation, the rows are encoded once for the response and the cache
+            response = QueryResponse.model_construct(
                 question=request.question,
                 sql_query=sql,
+                sql_parameters=None,
                 results=query_result.rows,
                 relevant_schema=relevant_schema,
-                confidence_score=confidence,
+                confidence_score=float(confidence),
                 mlflow_run_id=run.info.run_id
             )
+            encoded_response = encode_json(dict(response))
             
-            await cache_service.cache_query_result(request.question, response)
+            await cache_service.cache_query_result(request.question, schema_version, encoded_response)
+            # A reused example's sql is only stored under the question it was generated (or repaired) for
+            if not exact_example or exact_example.question == request.question or repair.repaired:
+                await example_store_service.add_example(
+                    request.question, sql, question_embedding, query_result.execution_time, schema_version
+                )
             
+            template = template_service.build_template(sql, literals, relevant_schema, confidence)
+            if template:
+                await cache_prepared_template(skeleton, schema_version, template)
+            
+            mlflow_service.log_template_usage(template_hit=False)
             mlflow_service.log_query_params(request.question, relevant_schema, sql)
             mlflow_service.log_query_metrics(confidence, query_result.row_count, query_result.execution_time)
             
-            return response
+            return FastJSONResponse(encoded_response)
             
         except Exception as e:
+            if isinstance(e, SqlRepairError):
+                mlflow_service.log_repair_metrics(
+                    e.repair.attempts, e.repair.repair_time, e.repair.repaired, e.repair.from_cache
+                )
             mlflow_service.log_error(str(e))
             raise HTTPException(status_code=500, detail=f"Query failed: {e}")
 
 
+async def cache_prepared_template(skeleton: str, schema_version: str, template: SqlTemplate) -> None:
+    """
+    Prepare a new sql template to get its parameter types, and only cache it if that works
+    (a template that doesn't prepare would just fail on every later question)
+    """
+    try:
+        parameter_types = await schema_service.get_parameter_types(template.sql)
+    except Exception as e:
+        logger.info(f"Sql template doesn't prepare, not caching it: {e}")
+        return
+    
+    template = template_service.with_parameter_types(template, parameter_types)
+    if template:
+        await cache_service.cache_template(skeleton, schema_version, template)
+
+
+async def run_cached_template(question: str, skeleton: str, literals: List[str],
+                              schema_version: str, run_id: str) -> Optional[FastJSONResponse]:
+    """
+    Execute a cached sql template for the question skeleton as a prepared statement.
+    Returns None on a miss, or if the template no longer works (it's dropped so it gets rebuilt).
+    """
+    if not literals:
+        return None
+    
+    template = await cache_service.get_cached_template(skeleton, schema_version)
+    if not template:
+        return None
+    
+    parameters = template_service.bind_parameters(template, literals)
+    if parameters is None:
+        return None
+    
+    try:
+        query_result = await schema_service.execute_prepared(template.sql, parameters)
+    except Exception as e:
+        logger.warning(f"Cached sql template failed, falling back to generation: {e}")
+        await cache_service.invalidate_template(skeleton, schema_version)
+        return None
+    
+    response = QueryResponse.model_construct(
+        question=question,
+        sql_query=template.sql,
+        sql_parameters=parameters,
+        results=query_result.rows,
+        relevant_schema=template.relevant_schema,
+        confidence_score=float(template.confidence),
+        mlflow_run_id=run_id
+    )
+    encoded_response = encode_json(dict(response))
+    
+    await cache_service.cache_query_result(question, schema_version, encoded_response)
+    
+    mlflow_service.log_template_usage(template_hit=True)
+    mlflow_service.log_query_params(question, template.relevant_schema, template.sql)
+    mlflow_service.log_query_metrics(template.confidence, query_result.row_count, query_result.execution_time)
+    
+    return FastJSONResponse(encoded_response)
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """
@@ -81,10 +202,11 @@ async def refresh_schema():
     """
 
     This endpoint re-initialises/refreshes the schema embeddings used for generating SQL queries.
+    The new embeddings are swapped in once complete, so queries keep using the old ones meanwhile.
     
     """
     try:
-        await schema_service.initialize_schema_embeddings()
+        await schema_watch_service.refresh(with_embeddings=True)
         return {"message": "Schema embeddings refreshed successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Schema refresh failed: {e}")
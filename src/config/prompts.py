@@ -1,3 +1,7 @@
+from typing import List, Optional
+from src.models.database_models import SqlExample
+
+
 class PromptTemplates:
     
     SQL_GENERATION_TEMPLATE = """You are an expert SQL query generator. Given a database schema and question, generate ONLY a SQL query.
@@ -11,6 +15,42 @@ Question: {question}
 
 Return only the SQL query:"""
 
+    SQL_GENERATION_WITH_EXAMPLES_TEMPLATE = """You are an expert SQL query generator. Given a database schema and question, generate ONLY a SQL query.
+
+IMPORTANT: Return ONLY the SQL query. Do not include any explanations, reasoning, markdown formatting, or additional text.
+
+Database Schema:
+{schema}
+
+Here are some similar questions that were answered correctly and efficiently against this schema:
+{examples}
+
+Question: {question}
+
+Return only the SQL query:"""
+
+    SQL_REPAIR_TEMPLATE = """You are an expert SQL query generator. The SQL query below failed when it was run against a PostgreSQL database. Fix it.
+
+IMPORTANT: Return ONLY the corrected SQL query. Do not include any explanations, reasoning, markdown formatting, or additional text.
+
+Affected tables:
+{schema}
+
+Question: {question}
+
+Failed SQL:
+{sql}
+
+Database error:
+{error}
+
+Return only the corrected SQL query:"""
+
+    SQL_EXAMPLE_TEMPLATE = """
+Question: {question}
+SQL: {sql}
+"""
+
     SCHEMA_SEMANTIC_DESCRIPTION_TEMPLATE = """Describe what this database table is used for based on its name and columns:
 
 Table: {table_name}
@@ -19,12 +59,31 @@ Columns: {columns}
 This table stores:"""
 
     @classmethod
-    def get_sql_prompt(cls, schema: str, question: str) -> str:
+    def get_sql_prompt(cls, schema: str, question: str, examples: Optional[List[SqlExample]] = None) -> str:
+        if examples:
+            examples_text = "".join(
+                cls.SQL_EXAMPLE_TEMPLATE.format(question=example.question, sql=example.sql)
+                for example in examples
+            )
+            return cls.SQL_GENERATION_WITH_EXAMPLES_TEMPLATE.format(
+                schema=schema,
+                examples=examples_text,
+                question=question
+            )
         return cls.SQL_GENERATION_TEMPLATE.format(
             schema=schema,
             question=question
         )
     
+    @classmethod
+    def get_sql_repair_prompt(cls, schema: str, question: str, sql: str, error: str) -> str:
+        return cls.SQL_REPAIR_TEMPLATE.format(
+            schema=schema,
+            question=question,
+            sql=sql,
+            error=error
+        )
+    
     @classmethod
     def get_semantic_description_prompt(cls, table_name: str, columns: str) -> str:
         return cls.SCHEMA_SEMANTIC_DESCRIPTION_TEMPLATE.format(
@@ -26,6 +26,34 @@ class Settings(BaseSettings):
     # Schema embeddings
     embedding_similarity_threshold: float
     
+    # Few-shot example store
+    example_store_path: str = "data/examples.db"
+    example_top_k: int = 3
+    example_exact_match_threshold: float = 0.98
+    example_max_execution_time: float = 1.0
+    example_max_age_days: int = 30
+    example_max_entries: int = 1000
+    
+    # SQL repair loop
+    sql_repair_max_attempts: int = 2
+    sql_repair_time_budget: float = 15.0
+    
+    # Profiling (opt-in)
+    profiling_enabled: bool = False
+    profiling_header: str = "X-Profile"
+    profiling_max_seconds: float = 30.0
+    profiling_sample_interval: float = 0.005
+    loop_lag_monitor_enabled: bool = False
+    loop_lag_threshold: float = 0.1
+    
+    # Schema change detection (seconds between DDL fingerprint checks, 0 disables)
+    schema_poll_interval: float = 60.0
+    
+    # Multi-worker mode: directory for the shared schema index (empty = single process)
+    shared_index_dir: str = ""
+    shared_index_poll_interval: float = 2.0
+    shared_index_startup_timeout: float = 30.0
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
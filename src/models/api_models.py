@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class QueryRequest(BaseModel):
@@ -9,6 +9,7 @@ class QueryRequest(BaseModel):
 class QueryResponse(BaseModel):
     question: str
     sql_query: str
+    sql_parameters: Optional[List[Any]] = None
     results: List[Dict]
     relevant_schema: str
     confidence_score: float
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Sequence
 
 
 @dataclass
@@ -24,3 +24,37 @@ class QueryResult:
     rows: List[Dict[str, Any]]
     execution_time: float
     row_count: int
+
+
+@dataclass
+class SqlExample:
+    question: str
+    sql: str
+    execution_time: float
+    schema_version: str
+    similarity: float = 0.0
+
+
+@dataclass
+class SqlTemplate:
+    sql: str
+    parameter_slots: List[int]
+    parameter_types: List[str]
+    relevant_schema: str
+    confidence: float
+
+
+@dataclass
+class SqlRepairResult:
+    attempts: int = 0
+    repair_time: float = 0.0
+    repaired: bool = False
+    from_cache: bool = False
+
+
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    version: str
+    tables: Dict[str, SchemaTable]
+    # Lists when built in-process, read-only memory-mapped rows when attached to a shared index
+    embeddings: Dict[str, Sequence[float]]
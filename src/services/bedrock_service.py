@@ -1,5 +1,6 @@
+import asyncio
 import json
-from typing import List
+from typing import Sequence
 import boto3
 import numpy as np
 from src.config.settings import get_settings
@@ -21,7 +22,9 @@ class BedrockService:
         Generate text using Bedrock claude with the 'Messages API' (its required for Claude 4)
         *Note:  Can change token limit as needed - reduce if you want shorter responses and faster response time
         """
-        response = self.client.invoke_model(
+        # boto3 is blocking, so the call runs in a thread to keep the event loop serving requests
+        response = await asyncio.to_thread(
+            self.client.invoke_model,
             modelId=self.settings.bedrock_inference_profile_id,
             body=json.dumps({
                 "anthropic_version": "bedrock-2023-05-31",
@@ -77,7 +80,8 @@ class BedrockService:
         Get the embedding from Bedrock
         
         """
-        response = self.client.invoke_model(
+        response = await asyncio.to_thread(
+            self.client.invoke_model,
             modelId=self.settings.bedrock_embedding_model,
             body=json.dumps({"inputText": text}),
             accept="application/json",
@@ -92,10 +96,11 @@ class BedrockService:
         )
     
     @staticmethod
-    def cosine_similarity(a: List[float], b: List[float]) -> float:
+    def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
         """
         Calculate cosine similarity between the two embeddings
         """
-        a_np = np.array(a)
-        b_np = np.array(b)
+        # asarray, so memory-mapped embeddings aren't copied
+        a_np = np.asarray(a)
+        b_np = np.asarray(b)
         return np.dot(a_np, b_np) / (np.linalg.norm(a_np) * np.linalg.norm(b_np))
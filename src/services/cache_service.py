@@ -1,4 +1,6 @@
+import hashlib
 import json
+from dataclasses import asdict
 from typing import Optional
 from src.config.logging import get_logger
 
@@ -13,7 +15,7 @@ except ImportError:
     REDIS_AVAILABLE = False
 
 from src.config.settings import get_settings
-from src.models.api_models import QueryResponse
+from src.models.database_models import SqlTemplate
 
 
 class CacheService:
@@ -21,44 +23,144 @@ class CacheService:
         self.settings = get_settings()
         if REDIS_AVAILABLE:
             self.redis = aioredis.from_url(self.settings.redis_url, decode_responses=True)
+            # Query results are stored and sent as encoded JSON bytes, so they skip decoding
+            self.redis_bytes = aioredis.from_url(self.settings.redis_url, decode_responses=False)
         else:
             self.redis = None
+            self.redis_bytes = None
     
-    async def get_cached_query(self, question: str) -> Optional[QueryResponse]:
+    async def get_cached_query(self, question: str, schema_version: str) -> Optional[bytes]:
         """
-        function to get the cached query result
+        function to get the cached query result, as the encoded JSON response
+        (it's sent as is, so large results are never parsed or re-validated)
+        """
+        if not REDIS_AVAILABLE or not self.redis_bytes:
+            return None
+            
+        try:
+            cache_key = f"query:{schema_version}:{question}"
+            cached = await self.redis_bytes.get(cache_key)
+            if cached:
+                return cached
+        except Exception as e:
+            logger.warning(f"cache read error: {e}")
+        return None
+    
+    async def cache_query_result(self, question: str, schema_version: str, encoded_response: bytes) -> None:
+        """
+        function to cache the query result, reusing the bytes that were encoded for the response
+        
+        """
+        if not REDIS_AVAILABLE or not self.redis_bytes:
+            return
+            
+        try:
+            cache_key = f"query:{schema_version}:{question}"
+            await self.redis_bytes.set(
+                cache_key,
+                encoded_response,
+                ex=self.settings.redis_cache_ttl
+            )
+        except Exception as e:
+            logger.warning(f"cache write error: {e}")
+    
+    async def get_cached_template(self, skeleton: str, schema_version: str) -> Optional[SqlTemplate]:
+        """
+        function to get the cached sql template for a question skeleton
         
         """
         if not REDIS_AVAILABLE or not self.redis:
             return None
             
         try:
-            cache_key = f"query:{question}"
+            cache_key = f"template:{schema_version}:{skeleton}"
             cached = await self.redis.get(cache_key)
             if cached:
-                return QueryResponse(**json.loads(cached))
+                return SqlTemplate(**json.loads(cached))
         except Exception as e:
             logger.warning(f"cache read error: {e}")
         return None
     
-    async def cache_query_result(self, question: str, response: QueryResponse) -> None:
+    async def cache_template(self, skeleton: str, schema_version: str, template: SqlTemplate) -> None:
         """
-        function to cache the query result
+        function to cache the sql template for a question skeleton
         
         """
         if not REDIS_AVAILABLE or not self.redis:
             return
             
         try:
-            cache_key = f"query:{question}"
+            cache_key = f"template:{schema_version}:{skeleton}"
             await self.redis.set(
                 cache_key,
-                response.model_dump_json(),
+                json.dumps(asdict(template)),
                 ex=self.settings.redis_cache_ttl
             )
         except Exception as e:
             logger.warning(f"cache write error: {e}")
     
+    async def invalidate_template(self, skeleton: str, schema_version: str) -> None:
+        """
+        function to drop a sql template that failed to execute
+        
+        """
+        if not REDIS_AVAILABLE or not self.redis:
+            return
+            
+        try:
+            await self.redis.delete(f"template:{schema_version}:{skeleton}")
+        except Exception as e:
+            logger.warning(f"cache delete error: {e}")
+    
+    async def get_repaired_sql(self, sql: str, schema_version: str) -> Optional[str]:
+        """
+        function to get the known repair for sql that failed before
+        
+        """
+        if not REDIS_AVAILABLE or not self.redis:
+            return None
+            
+        try:
+            sql_hash = hashlib.sha256(sql.encode()).hexdigest()
+            return await self.redis.get(f"repair:{schema_version}:{sql_hash}")
+        except Exception as e:
+            logger.warning(f"cache read error: {e}")
+        return None
+    
+    async def cache_repaired_sql(self, failed_sql: str, repaired_sql: str, schema_version: str) -> None:
+        """
+        function to cache the repair for sql that failed, so the same failure doesn't happen twice
+        
+        """
+        if not REDIS_AVAILABLE or not self.redis:
+            return
+            
+        try:
+            sql_hash = hashlib.sha256(failed_sql.encode()).hexdigest()
+            await self.redis.set(
+                f"repair:{schema_version}:{sql_hash}",
+                repaired_sql,
+                ex=self.settings.redis_cache_ttl
+            )
+        except Exception as e:
+            logger.warning(f"cache write error: {e}")
+    
+    async def invalidate_schema_version(self, schema_version: str) -> None:
+        """
+        function to drop everything cached for an old schema version
+        (templates, sql repairs and query results)
+        """
+        if not REDIS_AVAILABLE or not self.redis:
+            return
+            
+        try:
+            for pattern in (f"template:{schema_version}:*", f"repair:{schema_version}:*", f"query:{schema_version}:*"):
+                keys = [key async for key in self.redis.scan_iter(match=pattern, count=500)]
+                for i in range(0, len(keys), 500):
+                    await self.redis.unlink(*keys[i:i + 500])
+        except Exception as e:
+            logger.warning(f"cache invalidation error: {e}")
+    
     async def ping(self) -> bool:
         """
         Check if Redis is available:
@@ -0,0 +1,344 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from src.config.settings import get_settings
+from src.config.logging import get_logger
+from src.models.database_models import SqlExample
+from src.services.template_service import TemplateService
+
+logger = get_logger(__name__)
+
+
+def _encode_embedding(embedding) -> bytes:
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+class ExampleStoreService:
+    """
+    Local store of successful question -> SQL pairs (with their embeddings),
+    used for few-shot prompting and for skipping generation on near-exact matches.
+    """
+    def __init__(self):
+        self.settings = get_settings()
+        self.template_service = TemplateService()
+        self.store_available = False
+        # sqlite runs in worker threads; this serialises the connection and the in-memory index
+        self._lock = threading.Lock()
+        # In-memory index of the store, kept in sync incrementally (see _sync_index)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix: Optional[np.ndarray] = None
+        self._execution_times = np.empty(0, dtype=np.float64)
+        self._versions = np.empty(0, dtype=object)
+        self._examples: Dict[int, Tuple[str, str]] = {}
+        self._max_id = 0
+        # Embedding dimension of the index; rows from another embedding model are left out
+        self._dimension: Optional[int] = None
+
+        try:
+            store_dir = os.path.dirname(self.settings.example_store_path)
+            if store_dir:
+                os.makedirs(store_dir, exist_ok=True)
+            self.conn = sqlite3.connect(self.settings.example_store_path, check_same_thread=False)
+            # WAL lets several workers read while one writes
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS examples (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    question TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    execution_time REAL NOT NULL,
+                    schema_version TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    use_count INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (question, schema_version)
+                )
+                """
+            )
+            self._migrate_json_embeddings()
+            self.conn.commit()
+            self.store_available = True
+        except Exception as e:
+            logger.warning(f"Example store is not available: {e}")
+            logger.warning("Continuing without few-shot examples...")
+            self.conn = None
+
+    async def find_similar_examples(self, question_embedding: List[float], schema_version: str) -> List[SqlExample]:
+        """
+        Get the top-k most similar fast examples for the current schema version
+
+        """
+        if not self.store_available:
+            return []
+
+        try:
+            return await asyncio.to_thread(self._find_similar_examples, question_embedding, schema_version)
+        except Exception as e:
+            logger.warning(f"example store read error: {e}")
+            return []
+
+    async def find_exact_match(self, question: str, question_embedding: List[float],
+                               schema_version: str) -> Optional[SqlExample]:
+        """
+        Get an example that is a near-exact match for the question (same schema version),
+        so generation can be skipped entirely.
+        Questions that only differ in a literal ("... in 2010" / "... in 2011") embed almost
+        identically, so the extracted literals have to match exactly as well
+        """
+        if not self.store_available:
+            return None
+
+        try:
+            return await asyncio.to_thread(self._find_exact_match, question, question_embedding, schema_version)
+        except Exception as e:
+            logger.warning(f"example store read error: {e}")
+        return None
+
+    async def add_example(self, question: str, sql: str, question_embedding: List[float],
+                          execution_time: float, schema_version: str) -> None:
+        """
+        Persist a successful question/SQL pair, then evict stale or expensive entries
+
+        """
+        if not self.store_available:
+            return
+
+        try:
+            await asyncio.to_thread(
+                self._add_example, question, sql, question_embedding, execution_time, schema_version
+            )
+        except Exception as e:
+            logger.warning(f"example store write error: {e}")
+
+    async def remove_other_schema_versions(self, schema_version: str) -> None:
+        """
+        Drop examples written for any other schema version (they'd never be retrieved again)
+
+        """
+        if not self.store_available:
+            return
+
+        try:
+            await asyncio.to_thread(self._remove_other_schema_versions, schema_version)
+        except Exception as e:
+            logger.warning(f"example store write error: {e}")
+
+    def _find_similar_examples(self, question_embedding: List[float], schema_version: str) -> List[SqlExample]:
+        with self._lock:
+            self._sync_index(len(question_embedding))
+            examples = self._rank(
+                question_embedding, schema_version, fast_only=True, limit=self.settings.example_top_k
+            )
+            self._mark_used([example_id for example_id, _ in examples])
+            return [example for _, example in examples]
+
+    def _find_exact_match(self, question: str, question_embedding: List[float],
+                          schema_version: str) -> Optional[SqlExample]:
+        with self._lock:
+            self._sync_index(len(question_embedding))
+            _, literals = self.template_service.extract_literals(question)
+            candidates = self._rank(
+                question_embedding, schema_version, fast_only=False,
+                min_similarity=self.settings.example_exact_match_threshold
+            )
+            for example_id, example in candidates:
+                if self.template_service.extract_literals(example.question)[1] == literals:
+                    self._mark_used([example_id])
+                    return example
+            return None
+
+    def _add_example(self, question: str, sql: str, question_embedding: List[float],
+                     execution_time: float, schema_version: str) -> None:
+        embedding = _encode_embedding(question_embedding)
+        now = time.time()
+        with self._lock:
+            # Replacing gives the row a new id, so every process's index picks up the new sql
+            existing = self.conn.execute(
+                "SELECT created_at, use_count FROM examples WHERE question = ? AND schema_version = ?",
+                (question, schema_version)
+            ).fetchone()
+            created_at, use_count = existing if existing else (now, 0)
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO examples (question, sql, embedding, execution_time, schema_version,
+                                                 created_at, last_used_at, use_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (question, sql, embedding, execution_time, schema_version, created_at, now, use_count + 1)
+            )
+            self.conn.commit()
+            self.evict()
+            self._sync_index(len(question_embedding))
+
+    def _remove_other_schema_versions(self, schema_version: str) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM examples WHERE schema_version != ?", (schema_version,))
+            self.conn.commit()
+            self._sync_index(self._dimension)
+
+    def evict(self) -> None:
+        """
+        Evict examples once they're older than the max age, then the least frequently used
+        (uses per day since they were added) once the store is over capacity
+        """
+        now = time.time()
+        cutoff = now - self.settings.example_max_age_days * 86400
+        self.conn.execute("DELETE FROM examples WHERE created_at < ?", (cutoff,))
+
+        # Frequency rather than the raw count, so a new example isn't always first in line against
+        # rows that had days to be retrieved; then most expensive, then oldest
+        self.conn.execute(
+            """
+            DELETE FROM examples WHERE id IN (
+                SELECT id FROM examples
+                ORDER BY use_count / ((? - created_at) / 86400.0 + 1) ASC, execution_time DESC, created_at ASC
+                LIMIT MAX((SELECT COUNT(*) FROM examples) - ?, 0)
+            )
+            """,
+            (now, self.settings.example_max_entries)
+        )
+        self.conn.commit()
+
+    def _migrate_json_embeddings(self) -> None:
+        # Stores written before embeddings were float32 BLOBs kept them as JSON text
+        rows = self.conn.execute("SELECT id, embedding FROM examples WHERE typeof(embedding) = 'text'").fetchall()
+        self.conn.executemany(
+            "UPDATE examples SET embedding = ? WHERE id = ?",
+            [(_encode_embedding(json.loads(embedding)), example_id) for example_id, embedding in rows]
+        )
+
+    def _sync_index(self, dimension: Optional[int]) -> None:
+        """
+        Bring the in-memory index up to date with the store, including rows written by other processes:
+        rows with an id above the last one seen are appended, and deleted ids are dropped.
+        Only rows with embeddings of the given dimension are indexed, a new dimension (the embedding
+        model changed) rebuilds the index. When nothing changed this costs a single aggregate query
+        """
+        if dimension is None:
+            return
+        if dimension != self._dimension:
+            self._reset_index(dimension)
+
+        embedding_size = dimension * np.dtype(np.float32).itemsize
+        max_id, count = self.conn.execute(
+            "SELECT COALESCE(MAX(id), 0), COUNT(*) FROM examples WHERE length(embedding) = ?", (embedding_size,)
+        ).fetchone()
+        if max_id == self._max_id and count == len(self._ids):
+            return
+
+        if max_id > self._max_id:
+            rows = self.conn.execute(
+                """
+                SELECT id, question, sql, embedding, execution_time, schema_version FROM examples
+                WHERE id > ? AND length(embedding) = ?
+                """,
+                (self._max_id, embedding_size)
+            ).fetchall()
+            self._append_rows(rows)
+            self._max_id = max_id
+
+        if count != len(self._ids):
+            live_ids = np.fromiter(
+                (row[0] for row in self.conn.execute("SELECT id FROM examples WHERE length(embedding) = ?", (embedding_size,))),
+                dtype=np.int64
+            )
+            keep = np.isin(self._ids, live_ids)
+            for example_id in self._ids[~keep]:
+                self._examples.pop(int(example_id), None)
+            self._ids = self._ids[keep]
+            self._matrix = self._matrix[keep] if len(self._ids) else None
+            self._execution_times = self._execution_times[keep]
+            self._versions = self._versions[keep]
+
+    def _reset_index(self, dimension: int) -> None:
+        if self._dimension is not None:
+            logger.info(f"Example embeddings changed from {self._dimension} to {dimension} dims, rebuilding the index")
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix = None
+        self._execution_times = np.empty(0, dtype=np.float64)
+        self._versions = np.empty(0, dtype=object)
+        self._examples = {}
+        self._max_id = 0
+        self._dimension = dimension
+
+    def _append_rows(self, rows) -> None:
+        """
+        Append rows to the in-memory index (embeddings normalised, so ranking is a single matrix product)
+
+        """
+        if not rows:
+            return
+
+        ids, vectors, execution_times, versions = [], [], [], []
+        for example_id, question, sql, embedding, execution_time, schema_version in rows:
+            ids.append(example_id)
+            vectors.append(np.frombuffer(embedding, dtype=np.float32))
+            execution_times.append(execution_time)
+            versions.append(schema_version)
+            self._examples[example_id] = (question, sql)
+
+        matrix = np.vstack(vectors)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+
+        self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=np.int64)])
+        self._matrix = matrix if self._matrix is None else np.vstack([self._matrix, matrix])
+        self._execution_times = np.concatenate([self._execution_times, execution_times])
+        self._versions = np.concatenate([self._versions, np.asarray(versions, dtype=object)])
+
+    def _rank(self, question_embedding: List[float], schema_version: str, fast_only: bool,
+              limit: Optional[int] = None, min_similarity: Optional[float] = None) -> List[Tuple[int, SqlExample]]:
+        """
+        Rank the indexed examples for a schema version by cosine similarity to the question
+
+        """
+        if self._matrix is None or not len(self._ids):
+            return []
+
+        query = np.asarray(question_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0 or len(query) != self._matrix.shape[1]:
+            return []
+
+        mask = self._versions == schema_version
+        if fast_only:
+            mask &= self._execution_times <= self.settings.example_max_execution_time
+        positions = np.flatnonzero(mask)
+        scores = self._matrix[positions] @ (query / query_norm)
+
+        if min_similarity is not None:
+            above = scores >= min_similarity
+            positions, scores = positions[above], scores[above]
+        order = np.argsort(-scores)
+        if limit is not None:
+            order = order[:limit]
+
+        ranked = []
+        for i in order:
+            example_id = int(self._ids[positions[i]])
+            question, sql = self._examples[example_id]
+            ranked.append((example_id, SqlExample(
+                question=question,
+                sql=sql,
+                execution_time=float(self._execution_times[positions[i]]),
+                schema_version=schema_version,
+                similarity=float(scores[i])
+            )))
+        return ranked
+
+    def _mark_used(self, example_ids: List[int]) -> None:
+        if not example_ids:
+            return
+        self.conn.executemany(
+            "UPDATE examples SET use_count = use_count + 1, last_used_at = ? WHERE id = ?",
+            [(time.time(), example_id) for example_id in example_ids]
+        )
+        self.conn.commit()
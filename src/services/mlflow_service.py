@@ -53,6 +53,34 @@ class MLFlowService:
             mlflow.log_metric("row_count", row_count)
             mlflow.log_metric("execution_time", execution_time)
     
+    def log_example_usage(self, exact_match: bool, example_count: int):
+        """
+        Log how the few-shot example store was used
+        
+        """
+        if self.mlflow_available:
+            mlflow.log_param("example_exact_match", exact_match)
+            mlflow.log_metric("example_count", example_count)
+    
+    def log_template_usage(self, template_hit: bool):
+        """
+        Log whether the sql came from a cached parameterised template
+        
+        """
+        if self.mlflow_available:
+            mlflow.log_param("sql_template_hit", template_hit)
+    
+    def log_repair_metrics(self, attempts: int, repair_time: float, repaired: bool, from_cache: bool):
+        """
+        Log the sql repair attempts and what they cost
+        
+        """
+        if self.mlflow_available:
+            mlflow.log_metric("repair_attempts", attempts)
+            mlflow.log_metric("repair_time", repair_time)
+            mlflow.log_param("sql_repaired", repaired)
+            mlflow.log_param("sql_repair_from_cache", from_cache)
+    
     def log_error(self, error: str):
         """
         Log error information:
@@ -0,0 +1,160 @@
+import asyncio
+import cProfile
+import inspect
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from src.config.settings import get_settings
+from src.config.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProfilingService:
+    """
+    Opt-in profiling for a worker: per-request cProfile, time-boxed stack sampling
+    (folded/flamegraph output) and event loop stall detection.
+    """
+    def __init__(self):
+        self.settings = get_settings()
+        # Only one profiler may run at a time (cProfile can't nest, and two samplers would skew each other)
+        self._profile_lock = threading.Lock()
+        self._heartbeat = time.monotonic()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog_thread: Optional[threading.Thread] = None
+        self._watchdog_stop = threading.Event()
+
+    def start_request_profile(self) -> Optional[cProfile.Profile]:
+        """
+        Start a cProfile for a single request, returns None if another profile is running.
+        Note: this profiles the whole event loop thread, so concurrent requests show up too
+        """
+        if not self._profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop_request_profile(self, profiler: cProfile.Profile, limit: int = 50) -> str:
+        """
+        Stop the request profile and get the stats sorted by cumulative time
+
+        """
+        try:
+            profiler.disable()
+            output = io.StringIO()
+            stats = pstats.Stats(profiler, stream=output)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+            return output.getvalue()
+        finally:
+            self._profile_lock.release()
+
+    def sample_stacks(self, thread_id: int, seconds: float) -> Optional[str]:
+        """
+        Sample the stack of a thread for a number of seconds (blocking - run it off the event loop).
+        Returns folded stacks ("outer;inner count" per line) for flamegraph.pl / speedscope,
+        or None if another profile is running
+        """
+        if not self._profile_lock.acquire(blocking=False):
+            return None
+
+        try:
+            counts: Counter = Counter()
+            deadline = time.monotonic() + min(seconds, self.settings.profiling_max_seconds)
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    counts[";".join(reversed(stack))] += 1
+                time.sleep(self.settings.profiling_sample_interval)
+        finally:
+            self._profile_lock.release()
+
+        return "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+
+    async def start_loop_lag_monitor(self) -> None:
+        """
+        Start the event loop stall monitor: a coroutine keeps a heartbeat and a watchdog
+        thread logs (with the blocking coroutine) whenever the heartbeat stops for too long
+        """
+        if self._heartbeat_task is not None:
+            return
+
+        self._heartbeat = time.monotonic()
+        self._watchdog_stop.clear()
+        self._heartbeat_task = asyncio.create_task(self._beat())
+        self._watchdog_thread = threading.Thread(
+            target=self._watch,
+            args=(threading.get_ident(),),
+            name="loop-lag-watchdog",
+            daemon=True
+        )
+        self._watchdog_thread.start()
+        logger.info(f"Event loop lag monitor started (threshold {self.settings.loop_lag_threshold}s)")
+
+    async def stop_loop_lag_monitor(self) -> None:
+        """
+        Stop the event loop stall monitor
+
+        """
+        if self._heartbeat_task is None:
+            return
+
+        self._watchdog_stop.set()
+        self._heartbeat_task.cancel()
+        self._heartbeat_task = None
+        self._watchdog_thread = None
+
+    async def _beat(self) -> None:
+        interval = self.settings.loop_lag_threshold / 2
+        while True:
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(interval)
+
+    def _watch(self, loop_thread_id: int) -> None:
+        interval = self.settings.loop_lag_threshold / 2
+        stalled_since: Optional[float] = None
+
+        while not self._watchdog_stop.wait(interval / 2):
+            heartbeat = self._heartbeat
+            lag = time.monotonic() - heartbeat - interval
+
+            if lag < self.settings.loop_lag_threshold:
+                if stalled_since is not None:
+                    logger.warning(f"Event loop stall ended after {time.monotonic() - stalled_since:.3f}s")
+                    stalled_since = None
+                continue
+
+            if stalled_since is None:
+                stalled_since = heartbeat + interval
+                logger.warning(
+                    f"Event loop stalled for {lag:.3f}s: {self._describe_blocker(loop_thread_id)}"
+                )
+
+    @staticmethod
+    def _describe_blocker(thread_id: int) -> str:
+        """
+        Describe what the event loop thread is running: the innermost coroutine and the blocking call
+
+        """
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            return "unknown"
+
+        blocking = f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})"
+        while frame is not None:
+            code = frame.f_code
+            if code.co_flags & inspect.CO_COROUTINE:
+                # co_qualname is only available from python 3.11
+                name = getattr(code, "co_qualname", code.co_name)
+                return f"coroutine {name} ({code.co_filename}:{frame.f_lineno}) blocking in {blocking}"
+            frame = frame.f_back
+        return f"blocking in {blocking} (not inside a coroutine)"
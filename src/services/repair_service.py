@@ -0,0 +1,101 @@
+import re
+import time
+from typing import List, Tuple
+from sqlalchemy.exc import DBAPIError
+from src.config.settings import get_settings
+from src.config.prompts import PromptTemplates
+from src.config.logging import get_logger
+from src.models.database_models import QueryResult, SqlRepairResult
+from src.services.bedrock_service import BedrockService
+from src.services.cache_service import CacheService
+from src.services.schema_service import SchemaService, is_query_error
+
+logger = get_logger(__name__)
+
+
+class SqlRepairError(RuntimeError):
+    """
+    Raised when the sql still fails once the repair attempts or time budget are used up,
+    carrying the repair stats so they can still be logged
+    """
+    def __init__(self, message: str, repair: SqlRepairResult):
+        super().__init__(message)
+        self.repair = repair
+
+
+class SqlRepairService:
+    """
+    Validates generated SQL before running it and, when postgres rejects it,
+    reprompts with the error and the affected tables (bounded by attempts and time).
+    """
+    def __init__(self, schema_service: SchemaService, bedrock_service: BedrockService, cache_service: CacheService):
+        self.settings = get_settings()
+        self.schema_service = schema_service
+        self.bedrock_service = bedrock_service
+        self.cache_service = cache_service
+
+    async def execute_with_repair(self, question: str, sql: str, relevant_schema: str,
+                                  schema_version: str, validate: bool = True) -> Tuple[str, QueryResult, SqlRepairResult]:
+        """
+        Execute the sql, repairing it on failure.
+        Returns the sql that actually ran, its result, and the repair stats
+        """
+        start_time = time.time()
+        repair = SqlRepairResult()
+        failed_sqls: List[str] = []
+
+        known_repair = await self.cache_service.get_repaired_sql(sql, schema_version)
+        if known_repair:
+            failed_sqls.append(sql)
+            sql = known_repair
+            repair.repaired = True
+            repair.from_cache = True
+
+        while True:
+            error = await self.schema_service.validate_query(sql) if validate else None
+            if error is None:
+                try:
+                    query_result = await self.schema_service.execute_query(sql)
+                    break
+                except DBAPIError as e:
+                    # Connection/driver failures aren't something a reprompt can fix
+                    if not is_query_error(e):
+                        raise
+                    error = str(e.orig) if e.orig is not None else str(e)
+
+            elapsed = time.time() - start_time
+            if repair.attempts >= self.settings.sql_repair_max_attempts or elapsed >= self.settings.sql_repair_time_budget:
+                repair.repair_time = elapsed
+                raise SqlRepairError(f"SQL still failing after {repair.attempts} repair attempt(s): {error}", repair)
+
+            logger.info(f"Repairing failed SQL (attempt {repair.attempts + 1}): {error}")
+            failed_sqls.append(sql)
+            repair_prompt = PromptTemplates.get_sql_repair_prompt(
+                await self._affected_schema(sql, relevant_schema), question, sql, error
+            )
+            sql = await self.bedrock_service.generate_text(repair_prompt)
+            repair.attempts += 1
+            repair.repaired = True
+            # Always validate the repaired sql, even if the original was trusted
+            validate = True
+
+        if repair.repaired:
+            repair.repair_time = time.time() - start_time - query_result.execution_time
+            for failed_sql in failed_sqls:
+                if failed_sql != sql:
+                    await self.cache_service.cache_repaired_sql(failed_sql, sql, schema_version)
+
+        return sql, query_result, repair
+
+    async def _affected_schema(self, sql: str, relevant_schema: str) -> str:
+        """
+        Get the descriptions of only the tables the failed sql refers to
+
+        """
+        schema_info = await self.schema_service.get_schema_info()
+        descriptions = [
+            table.description
+            for table_name, table in schema_info.items()
+            if re.search(rf"\b{re.escape(table_name)}\b", sql, re.IGNORECASE)
+        ]
+        return "\n".join(descriptions) if descriptions else relevant_schema
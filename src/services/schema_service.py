@@ -1,9 +1,11 @@
-from typing import Dict, List, Tuple
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from sqlalchemy import create_engine, text, inspect
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from src.config.settings import get_settings
-from src.models.database_models import SchemaTable, QueryResult
+from src.models.database_models import SchemaTable, SchemaSnapshot, QueryResult
 from src.services.bedrock_service import BedrockService
 from src.config.prompts import PromptTemplates
 from src.config.logging import get_logger
@@ -11,83 +13,115 @@ from src.config.logging import get_logger
 logger = get_logger(__name__)
 
 
+def is_query_error(error: DBAPIError) -> bool:
+    """
+    Whether postgres rejected the query itself (syntax, unknown column, bad cast, ...),
+    as opposed to a connection or driver failure that rewriting the sql can't fix
+    """
+    return not error.connection_invalidated and not isinstance(error, (InterfaceError, OperationalError))
+
+
+# Hash over the columns and constraints of the current schema, cheap enough to poll
+SCHEMA_FINGERPRINT_SQL = """
+SELECT md5(
+    coalesce((
+        SELECT string_agg(
+            c.relname || '.' || a.attname || ':' || format_type(a.atttypid, a.atttypmod) || ':' || a.attnotnull::text,
+            ',' ORDER BY c.relname, a.attnum
+        )
+        FROM pg_catalog.pg_attribute a
+        JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped
+    ), '')
+    || '|' ||
+    coalesce((
+        SELECT string_agg(
+            c.relname || '.' || con.conname || ':' || pg_get_constraintdef(con.oid),
+            ',' ORDER BY c.relname, con.conname
+        )
+        FROM pg_catalog.pg_constraint con
+        JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema()
+    ), '')
+)
+"""
+
+
 class SchemaService:
     def __init__(self):
         
         self.settings = get_settings()
         self.bedrock_service = BedrockService()
-        self.embeddings_cache: Dict[str, List[float]] = {}
-        self.schema_details: Dict[str, SchemaTable] = {}
+        # Tables, embeddings and version are replaced together in one assignment,
+        # so readers never see a half-built schema while it's being re-indexed
+        self.snapshot = SchemaSnapshot(version="", tables={}, embeddings={})
         
 
         self.async_engine = create_async_engine(self.settings.postgres_uri, echo=False)
         self.async_session = sessionmaker(self.async_engine, class_=AsyncSession, expire_on_commit=False)
     
+    @property
+    def schema_details(self) -> Dict[str, SchemaTable]:
+        return self.snapshot.tables
+    
+    @property
+    def embeddings_cache(self) -> Dict[str, Sequence[float]]:
+        return self.snapshot.embeddings
+    
     async def initialize_schema_embeddings(self) -> None:
         """
-        Initialise and cache the schema embeddings
-        
+        Initialise and cache the schema embeddings.
+        The new schema is built off to the side and swapped in once complete.
         """
-        sync_engine = create_engine(self.settings.postgres_uri.replace("+asyncpg", ""))
-        inspector = inspect(sync_engine)
+        version = await self.get_schema_fingerprint()
+        tables = await asyncio.to_thread(self._inspect_tables)
+        embeddings: Dict[str, List[float]] = {}
         
-        for table_name in inspector.get_table_names():
-            columns = inspector.get_columns(table_name)
-            pks = inspector.get_pk_constraint(table_name)['constrained_columns']
-            fks = inspector.get_foreign_keys(table_name)
-            
-            # Create a description
-            technical_desc = f"Table '{table_name}' with columns: "
-            technical_desc += ", ".join([f"{col['name']} ({col['type']})" for col in columns])
-            
+        for table_name, schema_table in tables.items():
             # Generate a semantic description using the LLM:
-            columns_str = ", ".join([f"{col['name']} ({col['type']})" for col in columns])
+            columns_str = ", ".join([f"{name} ({col_type})" for name, col_type in schema_table.columns.items()])
             semantic_prompt = PromptTemplates.get_semantic_description_prompt(table_name, columns_str)
-            semantic_desc = await self.bedrock_service.generate_text(semantic_prompt, max_tokens=100)
-            
-            schema_table = SchemaTable(
-                name=table_name,
-                columns={col['name']: str(col['type']) for col in columns},
-                primary_keys=pks,
-                foreign_keys=fks,
-                description=technical_desc,
-                semantic_description=semantic_desc
-            )
-            self.schema_details[table_name] = schema_table
+            schema_table.semantic_description = await self.bedrock_service.generate_text(semantic_prompt, max_tokens=100)
             
-            tech_embedding = await self.bedrock_service.get_embedding(technical_desc)
-            sem_embedding = await self.bedrock_service.get_embedding(semantic_desc)
+            tech_embedding = await self.bedrock_service.get_embedding(schema_table.description)
+            sem_embedding = await self.bedrock_service.get_embedding(schema_table.semantic_description)
             
-            self.embeddings_cache[f"{table_name}_technical"] = tech_embedding.embedding
-            self.embeddings_cache[f"{table_name}_semantic"] = sem_embedding.embedding
+            embeddings[f"{table_name}_technical"] = tech_embedding.embedding
+            embeddings[f"{table_name}_semantic"] = sem_embedding.embedding
+        
+        self.snapshot = SchemaSnapshot(version=version, tables=tables, embeddings=embeddings)
     
-    async def find_relevant_schema(self, question: str) -> Tuple[str, float]:
+    async def find_relevant_schema(self, question: str, question_embedding: Optional[List[float]] = None) -> Tuple[str, float]:
         """
         Find the most relevant schema parts for a question
-        
+        (pass question_embedding to reuse an embedding that was already computed)
         """
-        if not self.embeddings_cache:
+        snapshot = self.snapshot
+        if not snapshot.embeddings:
             logger.info("Embeddings are not initialized, returning all schema info")
-            await self.get_schema_info()
+            schema_info = await self.get_schema_info()
             schema_text = "Available tables:\n"
-            for table_name, table_info in self.schema_details.items():
+            for table_name, table_info in schema_info.items():
                 schema_text += f"\n{table_info.description}"
             return schema_text, 0.5 
         
-        question_embedding = await self.bedrock_service.get_embedding(question)
+        if question_embedding is None:
+            question_embedding = (await self.bedrock_service.get_embedding(question)).embedding
         
         best_score = -1
         relevant_tables = []
         
-        for table_name in self.schema_details:
+        for table_name in snapshot.tables:
             # cosine similarity scores
             technical_score = self.bedrock_service.cosine_similarity(
-                question_embedding.embedding,
-                self.embeddings_cache[f"{table_name}_technical"]
+                question_embedding,
+                snapshot.embeddings[f"{table_name}_technical"]
             )
             semantic_score = self.bedrock_service.cosine_similarity(
-                question_embedding.embedding,
-                self.embeddings_cache[f"{table_name}_semantic"]
+                question_embedding,
+                snapshot.embeddings[f"{table_name}_semantic"]
             )
             
             # weighted combinations
@@ -103,7 +137,7 @@ class SchemaService:
         if relevant_tables:
             schema_text = "Relevant tables:\\n"
             for table_name, score in relevant_tables[:3]: 
-                table_info = self.schema_details[table_name]
+                table_info = snapshot.tables[table_name]
                 schema_text += f"\\n{table_info.description}"
                 
                 # Add fk relationships
@@ -115,6 +149,20 @@ class SchemaService:
         
         return "No relevant schema found", 0.0
     
+    async def validate_query(self, sql: str) -> Optional[str]:
+        """
+        Check the sql with EXPLAIN (plans it without running it).
+        Returns the postgres error message, or None if the query is valid (connection errors are raised)
+        """
+        async with self.async_session() as session:
+            try:
+                await session.execute(text(f"EXPLAIN {sql}"))
+            except DBAPIError as e:
+                if not is_query_error(e):
+                    raise
+                return str(e.orig) if e.orig is not None else str(e)
+        return None
+    
     async def execute_query(self, sql: str) -> QueryResult:
         """
         Execute the sql query and return the results
@@ -147,15 +195,83 @@ class SchemaService:
             row_count=len(rows)
         )
     
+    async def execute_prepared(self, sql: str, parameters: List[Any]) -> QueryResult:
+        """
+        Execute a parameterised sql template ($1, $2, ...) as a prepared statement.
+        This goes straight to asyncpg so its statement cache lets postgres reuse the query plan.
+        """
+        import time
+        start_time = time.time()
+        
+        async with self.async_engine.connect() as conn:
+            raw_connection = await conn.get_raw_connection()
+            records = await raw_connection.driver_connection.fetch(sql, *parameters)
+            rows = [dict(record) for record in records]
+        
+        execution_time = time.time() - start_time
+        
+        return QueryResult(
+            rows=rows,
+            execution_time=execution_time,
+            row_count=len(rows)
+        )
+
+    async def get_parameter_types(self, sql: str) -> List[str]:
+        """
+        Prepare a parameterised sql template and get the postgres type of each parameter (e.g. int4, text, date).
+        Raises if the template doesn't prepare.
+        """
+        async with self.async_engine.connect() as conn:
+            raw_connection = await conn.get_raw_connection()
+            statement = await raw_connection.driver_connection.prepare(sql)
+            return [parameter.name for parameter in statement.get_parameters()]
+
     async def get_schema_info(self) -> Dict[str, SchemaTable]:
         """
         Get schema information without embeddings (for API endpoint)
         (this is used when embeddings are not initialised.)
         """
-        if not self.schema_details:
+        if not self.snapshot.tables:
+            await self.load_schema()
+        
+        return self.snapshot.tables
+    
+    async def load_schema(self) -> None:
+        """
+        Reload the tables without embeddings, swapping in the new schema once complete
+        
+        """
+        version = await self.get_schema_fingerprint()
+        tables = await asyncio.to_thread(self._inspect_tables)
+        self.snapshot = SchemaSnapshot(version=version, tables=tables, embeddings={})
+    
+    async def get_schema_version(self) -> str:
+        """
+        Get the DDL fingerprint of the loaded schema, used to tie cached artefacts to a schema
+        
+        """
+        if not self.snapshot.version:
+            await self.load_schema()
+        return self.snapshot.version
+    
+    async def get_schema_fingerprint(self) -> str:
+        """
+        Get the current DDL fingerprint from pg_catalog (columns and constraints)
+        
+        """
+        async with self.async_session() as session:
+            result = await session.execute(text(SCHEMA_FINGERPRINT_SQL))
+            return result.scalar_one()
+    
+    def _inspect_tables(self) -> Dict[str, SchemaTable]:
+        """
+        Read the tables with the (blocking) sqlalchemy inspector - run it off the event loop
         
-            sync_engine = create_engine(self.settings.postgres_uri.replace("+asyncpg", ""))
+        """
+        sync_engine = create_engine(self.settings.postgres_uri.replace("+asyncpg", ""))
+        try:
             inspector = inspect(sync_engine)
+            tables: Dict[str, SchemaTable] = {}
             
             for table_name in inspector.get_table_names():
                 columns = inspector.get_columns(table_name)
@@ -165,7 +281,7 @@ class SchemaService:
                 description = f"Table '{table_name}' with columns: "
                 description += ", ".join([f"{col['name']} ({col['type']})" for col in columns])
                 
-                schema_table = SchemaTable(
+                tables[table_name] = SchemaTable(
                     name=table_name,
                     columns={col['name']: str(col['type']) for col in columns},
                     primary_keys=pks,
@@ -173,6 +289,6 @@ class SchemaService:
                     description=description,
                     semantic_description=""
                 )
-                self.schema_details[table_name] = schema_table
-        
-        return self.schema_details
+            return tables
+        finally:
+            sync_engine.dispose()
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Optional
+from src.config.settings import get_settings
+from src.config.logging import get_logger
+from src.services.cache_service import CacheService
+from src.services.example_store_service import ExampleStoreService
+from src.services.schema_service import SchemaService
+
+logger = get_logger(__name__)
+
+
+class SchemaWatchService:
+    """
+    Background detection of schema changes: polls the DDL fingerprint and, when it changes,
+    re-indexes the schema off to the side and drops everything cached for the old version.
+    """
+    def __init__(self, schema_service: SchemaService, cache_service: CacheService,
+                 example_store_service: ExampleStoreService):
+        self.settings = get_settings()
+        self.schema_service = schema_service
+        self.cache_service = cache_service
+        self.example_store_service = example_store_service
+        self._poll_task: Optional[asyncio.Task] = None
+        # Refreshes (polled or via the api) run one at a time
+        self._refresh_lock = asyncio.Lock()
+
+    async def refresh(self, with_embeddings: bool) -> None:
+        """
+        Rebuild the schema (and optionally its embeddings) and swap it in,
+        then invalidate the caches if the schema version changed
+        """
+        async with self._refresh_lock:
+            old_version = self.schema_service.snapshot.version
+            if with_embeddings:
+                await self.schema_service.initialize_schema_embeddings()
+            else:
+                await self.schema_service.load_schema()
+            new_version = self.schema_service.snapshot.version
+
+        if old_version and new_version != old_version:
+            logger.info(f"Schema changed ({old_version} -> {new_version}), invalidating cached entries")
+            await self.cache_service.invalidate_schema_version(old_version)
+            await self.example_store_service.remove_other_schema_versions(new_version)
+
+    async def start(self) -> None:
+        """
+        Start polling the DDL fingerprint in the background
+
+        """
+        if self._poll_task is not None or self.settings.schema_poll_interval <= 0:
+            return
+        self._poll_task = asyncio.create_task(self._poll())
+        logger.info(f"Schema change detection started (every {self.settings.schema_poll_interval}s)")
+
+    async def stop(self) -> None:
+        """
+        Stop polling the DDL fingerprint
+
+        """
+        if self._poll_task is None:
+            return
+        self._poll_task.cancel()
+        self._poll_task = None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.schema_poll_interval)
+            try:
+                fingerprint = await self.schema_service.get_schema_fingerprint()
+                if fingerprint != self.schema_service.snapshot.version:
+                    # Keep embeddings if they were initialised, otherwise just reload the tables
+                    await self.refresh(with_embeddings=bool(self.schema_service.snapshot.embeddings))
+            except Exception as e:
+                logger.warning(f"Schema change check failed: {e}")
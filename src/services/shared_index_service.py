@@ -0,0 +1,260 @@
+import asyncio
+import fcntl
+import json
+import os
+import shutil
+import time
+from dataclasses import asdict
+from typing import Dict, Optional
+import numpy as np
+from src.config.settings import get_settings
+from src.config.logging import get_logger
+from src.models.database_models import SchemaSnapshot, SchemaTable
+from src.services.schema_service import SchemaService
+from src.services.schema_watch_service import SchemaWatchService
+
+logger = get_logger(__name__)
+
+CURRENT_FILE = "CURRENT"
+LEADER_LOCK_FILE = "leader.lock"
+# Written by a leader whose first build/publish failed, so followers stop waiting for it
+LEADER_FAILED_FILE = "leader.failed"
+METADATA_FILE = "metadata.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+KEEP_GENERATIONS = 3
+
+
+def publish_snapshot(index_dir: str, snapshot: SchemaSnapshot) -> str:
+    """
+    Write a schema snapshot as a new generation (metadata + float32 embedding matrix),
+    then point CURRENT at it with an atomic rename. Returns the generation id
+    """
+    generation = f"{time.time_ns()}-{os.getpid()}"
+    generation_dir = os.path.join(index_dir, generation)
+    os.makedirs(generation_dir)
+
+    keys = list(snapshot.embeddings)
+    if keys:
+        matrix = np.asarray([snapshot.embeddings[key] for key in keys], dtype=np.float32)
+        np.save(os.path.join(generation_dir, EMBEDDINGS_FILE), matrix)
+
+    metadata = {
+        "version": snapshot.version,
+        "tables": [asdict(table) for table in snapshot.tables.values()],
+        "embedding_rows": {key: row for row, key in enumerate(keys)},
+    }
+    with open(os.path.join(generation_dir, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, default=str)
+
+    current_tmp = os.path.join(index_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(current_tmp, "w") as f:
+        f.write(generation)
+    os.replace(current_tmp, os.path.join(index_dir, CURRENT_FILE))
+
+    _remove_old_generations(index_dir, keep=generation)
+    return generation
+
+
+def read_current_generation(index_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_snapshot(index_dir: str, generation: str) -> SchemaSnapshot:
+    """
+    Load a published generation. The embedding matrix is memory-mapped read-only,
+    so every worker shares the same pages instead of holding its own copy
+    """
+    generation_dir = os.path.join(index_dir, generation)
+    with open(os.path.join(generation_dir, METADATA_FILE)) as f:
+        metadata = json.load(f)
+
+    embeddings: Dict[str, np.ndarray] = {}
+    if metadata["embedding_rows"]:
+        matrix = np.load(os.path.join(generation_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        embeddings = {key: matrix[row] for key, row in metadata["embedding_rows"].items()}
+
+    return SchemaSnapshot(
+        version=metadata["version"],
+        tables={table["name"]: SchemaTable(**table) for table in metadata["tables"]},
+        embeddings=embeddings
+    )
+
+
+def _remove_old_generations(index_dir: str, keep: str) -> None:
+    # Workers still mapping a removed generation keep their pages until they switch over
+    generations = sorted(
+        entry for entry in os.listdir(index_dir)
+        if os.path.isdir(os.path.join(index_dir, entry)) and entry != keep
+    )
+    for generation in generations[:max(len(generations) - (KEEP_GENERATIONS - 1), 0)]:
+        shutil.rmtree(os.path.join(index_dir, generation), ignore_errors=True)
+
+
+class SharedIndexService:
+    """
+    Multi-worker mode: one leader process builds the schema snapshot and publishes it to
+    SHARED_INDEX_DIR (ideally on /dev/shm); the other workers attach to it read-only.
+    The leader is whoever holds the lock file, so a follower takes over if the leader dies.
+    """
+    def __init__(self, schema_service: SchemaService, schema_watch_service: SchemaWatchService):
+        self.settings = get_settings()
+        self.schema_service = schema_service
+        self.schema_watch_service = schema_watch_service
+        self.index_dir = self.settings.shared_index_dir
+        self.is_leader = False
+        self._leader_lock_file = None
+        self._generation: Optional[str] = None
+        # The snapshot last published or attached, anything else was built locally and gets published
+        self._shared_snapshot: Optional[SchemaSnapshot] = None
+        self._follow_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.index_dir)
+
+    async def start(self) -> None:
+        """
+        Become the leader (build and publish) or attach to the leader's snapshot,
+        then keep following new generations in the background
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        try:
+            if self._try_become_leader():
+                await self._lead()
+            elif not await self._wait_for_generation():
+                logger.warning("No shared schema index was published, loading the schema locally")
+                await self.schema_service.get_schema_info()
+        finally:
+            # Even if the first load failed, later (re)loads still get published/attached
+            self._follow_task = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        """
+        Stop following the shared index and give up leadership
+
+        """
+        if self._follow_task is not None:
+            self._follow_task.cancel()
+            self._follow_task = None
+        if self.is_leader:
+            await self.schema_watch_service.stop()
+            fcntl.flock(self._leader_lock_file, fcntl.LOCK_UN)
+            self._leader_lock_file.close()
+            self._leader_lock_file = None
+            self.is_leader = False
+
+    def attach(self) -> bool:
+        """
+        Swap in the current published generation, if it's newer than the one in use
+
+        """
+        generation = read_current_generation(self.index_dir)
+        if generation is None or generation == self._generation:
+            return False
+
+        snapshot = load_snapshot(self.index_dir, generation)
+        self.schema_service.snapshot = snapshot
+        self._shared_snapshot = snapshot
+        self._generation = generation
+        logger.info(f"Attached to shared schema index generation {generation} (schema version {snapshot.version})")
+        return True
+
+    def publish(self) -> None:
+        """
+        Publish this process's schema snapshot as a new generation
+
+        """
+        snapshot = self.schema_service.snapshot
+        generation = publish_snapshot(self.index_dir, snapshot)
+        self._shared_snapshot = snapshot
+        self._generation = generation
+        self._set_leader_failed(False)
+        logger.info(f"Published shared schema index generation {generation} (schema version {snapshot.version})")
+
+    async def _lead(self) -> None:
+        self._set_leader_failed(False)
+        await self.schema_watch_service.start()
+        try:
+            # Reuse the published generation if it still matches the database, e.g. after a leader restart
+            generation = read_current_generation(self.index_dir)
+            if generation is not None:
+                if self._generation_version(generation) == await self.schema_service.get_schema_fingerprint():
+                    self.attach()
+            if self._generation is None:
+                await self.schema_service.get_schema_info()
+                self.publish()
+        except Exception:
+            self._set_leader_failed(True)
+            raise
+
+    async def _wait_for_generation(self) -> bool:
+        """
+        Wait for the leader's first generation. Gives up early if the leader failed to build it,
+        and takes over if the leader exited before publishing
+        """
+        deadline = time.monotonic() + self.settings.shared_index_startup_timeout
+        while time.monotonic() < deadline:
+            if self.attach():
+                return True
+            if read_current_generation(self.index_dir) is None:
+                if os.path.exists(os.path.join(self.index_dir, LEADER_FAILED_FILE)):
+                    return False
+                if self._try_become_leader():
+                    logger.info("Shared schema index leader exited before publishing, taking over")
+                    await self._lead()
+                    return True
+            await asyncio.sleep(self.settings.shared_index_poll_interval)
+        return False
+
+    async def _follow(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.shared_index_poll_interval)
+            try:
+                if not self.is_leader and self._try_become_leader():
+                    logger.info("Took over as shared schema index leader")
+                    await self.schema_watch_service.start()
+
+                snapshot = self.schema_service.snapshot
+                if snapshot is not self._shared_snapshot and snapshot.version:
+                    # Rebuilt in this process (schema change or /schema/refresh)
+                    self.publish()
+                else:
+                    self.attach()
+            except Exception as e:
+                logger.warning(f"Shared schema index update failed: {e}")
+
+    def _generation_version(self, generation: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.index_dir, generation, METADATA_FILE)) as f:
+                return json.load(f)["version"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _set_leader_failed(self, failed: bool) -> None:
+        path = os.path.join(self.index_dir, LEADER_FAILED_FILE)
+        if failed:
+            with open(path, "w") as f:
+                f.write(str(os.getpid()))
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _try_become_leader(self) -> bool:
+        if self.is_leader:
+            return True
+        lock_file = open(os.path.join(self.index_dir, LEADER_LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._leader_lock_file = lock_file
+        self.is_leader = True
+        return True
@@ -0,0 +1,149 @@
+import datetime
+import decimal
+import re
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.config.logging import get_logger
+from src.models.database_models import SqlTemplate
+
+logger = get_logger(__name__)
+
+# Literals in a question: quoted text, ISO dates, numbers, and Title Case names (e.g. "United States")
+QUESTION_LITERAL_PATTERN = re.compile(
+    r"\"(?P<dquoted>[^\"]+)\""
+    r"|'(?P<squoted>[^']+)'"
+    r"|(?<![\w.-])(?P<date>\d{4}-\d{2}-\d{2})(?![\w.-])"
+    r"|(?<![\w.])(?P<number>-?\d+(?:\.\d+)?)(?!\w)"
+    r"|\b(?P<name>[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b"
+)
+
+# Literals in generated SQL: quoted identifiers (left alone), typed literals (DATE '...'), string literals and numbers
+SQL_LITERAL_PATTERN = re.compile(
+    r"(?P<identifier>\"[^\"]*\")"
+    r"|(?i:\b(?P<type_name>date|timestamp|timestamptz)\s+)'(?P<typed>(?:[^']|'')*)'"
+    r"|'(?P<string>(?:[^']|'')*)'"
+    r"|(?<![\w$.])(?P<number>-?\d+(?:\.\d+)?)(?![\w.])"
+)
+
+# How a literal is converted for each postgres parameter type asyncpg reports when the template is prepared
+PARAMETER_COERCIONS: Dict[str, Callable[[str], Any]] = {
+    "int2": int,
+    "int4": int,
+    "int8": int,
+    "float4": float,
+    "float8": float,
+    "numeric": decimal.Decimal,
+    "date": datetime.date.fromisoformat,
+    "timestamp": datetime.datetime.fromisoformat,
+    "timestamptz": datetime.datetime.fromisoformat,
+    "text": str,
+    "varchar": str,
+    "bpchar": str,
+    "name": str,
+}
+
+
+class TemplateService:
+    """
+    Turns generated SQL into parameterised templates, so questions that only differ
+    in their literals ("GDP of France in 2010" / "GDP of Spain in 2015") can reuse it.
+    """
+
+    def extract_literals(self, question: str) -> Tuple[str, List[str]]:
+        """
+        Split a question into a normalised skeleton and its literal values
+
+        """
+        literals: List[str] = []
+        skeleton_parts: List[str] = []
+        position = 0
+        stripped = question.strip()
+
+        for match in QUESTION_LITERAL_PATTERN.finditer(stripped):
+            kind = match.lastgroup
+            # The first word is usually capitalised because it starts the sentence
+            if kind == "name" and match.start() == 0:
+                continue
+            skeleton_parts.append(stripped[position:match.start()])
+            skeleton_parts.append({"number": "<num>", "date": "<date>"}.get(kind, "<str>"))
+            literals.append(match.group(kind))
+            position = match.end()
+        skeleton_parts.append(stripped[position:])
+
+        skeleton = " ".join("".join(skeleton_parts).lower().split()).rstrip("?.! ")
+        return skeleton, literals
+
+    def build_template(self, sql: str, literals: List[str], relevant_schema: str,
+                       confidence: float) -> Optional[SqlTemplate]:
+        """
+        Replace the question's literals in the SQL with bound parameters ($1, $2, ...).
+        Returns None when the SQL can't be safely reused for other literal values.
+        The parameter types are filled in by with_parameter_types once the template is prepared
+        """
+        if not literals or len(set(literals)) != len(literals):
+            return None
+
+        parameter_slots: List[int] = []
+
+        def substitute(match: re.Match) -> str:
+            kind = match.lastgroup
+            if kind == "identifier":
+                return match.group(0)
+            value = match.group(kind).replace("''", "'") if kind in ("string", "typed") else match.group(kind)
+            if value not in literals:
+                return match.group(0)
+            slot = literals.index(value)
+            if slot not in parameter_slots:
+                parameter_slots.append(slot)
+            parameter = f"${parameter_slots.index(slot) + 1}"
+            # DATE $1 isn't valid sql, the typed literal becomes a cast
+            if kind == "typed":
+                return f"{parameter}::{match.group('type_name').lower()}"
+            return parameter
+
+        template_sql = SQL_LITERAL_PATTERN.sub(substitute, sql)
+
+        # Every literal has to be bound, and none may survive inside other text (e.g. LIKE '%France%')
+        if len(parameter_slots) != len(literals):
+            return None
+        for literal in literals:
+            if re.search(rf"(?<![\w$]){re.escape(literal)}(?!\w)", template_sql, re.IGNORECASE):
+                return None
+
+        return SqlTemplate(
+            sql=template_sql,
+            parameter_slots=parameter_slots,
+            parameter_types=[],
+            relevant_schema=relevant_schema,
+            confidence=confidence
+        )
+
+    def with_parameter_types(self, template: SqlTemplate, parameter_types: List[str]) -> Optional[SqlTemplate]:
+        """
+        Set the postgres parameter types reported when the template was prepared.
+        Returns None if a literal can't be converted to one of them (so the template isn't cached)
+        """
+        if len(parameter_types) != len(template.parameter_slots):
+            return None
+        unsupported = [name for name in parameter_types if name not in PARAMETER_COERCIONS]
+        if unsupported:
+            logger.info(f"Not caching sql template with unsupported parameter types: {unsupported}")
+            return None
+        return replace(template, parameter_types=parameter_types)
+
+    def bind_parameters(self, template: SqlTemplate, literals: List[str]) -> Optional[List[Any]]:
+        """
+        Get the parameter values for a template from a new question's literals,
+        converted to the template's parameter types
+        """
+        if len(literals) != len(template.parameter_slots) or len(template.parameter_types) != len(literals):
+            return None
+
+        parameters: List[Any] = []
+        try:
+            for slot, parameter_type in zip(template.parameter_slots, template.parameter_types):
+                parameters.append(PARAMETER_COERCIONS[parameter_type](literals[slot]))
+        except (KeyError, ValueError, decimal.InvalidOperation) as e:
+            logger.info(f"Literals don't fit template parameter types: {e}")
+            return None
+        return parameters
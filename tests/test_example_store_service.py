@@ -0,0 +1,114 @@
+import asyncio
+import time
+import pytest
+from src.config.settings import Settings
+from src.services import example_store_service
+from src.services.example_store_service import ExampleStoreService
+
+
+@pytest.fixture
+def make_store(tmp_path, monkeypatch):
+    def make(**overrides):
+        settings = Settings.model_construct(example_store_path=str(tmp_path / "examples.db"), **overrides)
+        monkeypatch.setattr(example_store_service, "get_settings", lambda: settings)
+        return ExampleStoreService()
+    return make
+
+
+def stored_questions(store):
+    return {row[0] for row in store.conn.execute("SELECT question FROM examples")}
+
+
+def test_new_examples_are_kept_when_the_store_is_full(make_store):
+    store = make_store(example_max_entries=3)
+    asyncio.run(store.add_example("old a", "SELECT 1", [1.0, 0.0], 0.1, "v1"))
+    asyncio.run(store.add_example("old b", "SELECT 2", [0.0, 1.0], 0.1, "v1"))
+    for _ in range(3):
+        asyncio.run(store.find_similar_examples([1.0, 1.0], "v1"))
+
+    for i in range(5):
+        asyncio.run(store.add_example(f"q{i}", f"SELECT {i}", [1.0, float(i)], 0.1, "v1"))
+
+    # The often retrieved examples stay, and the newest example replaces the previous new one
+    assert stored_questions(store) == {"old a", "old b", "q4"}
+
+
+def test_rarely_used_old_examples_make_room_for_new_ones(make_store):
+    store = make_store(example_max_entries=2)
+    asyncio.run(store.add_example("old a", "SELECT 1", [1.0, 0.0], 0.1, "v1"))
+    asyncio.run(store.add_example("old b", "SELECT 2", [0.0, 1.0], 0.1, "v1"))
+    ten_days_ago = time.time() - 10 * 86400
+    store.conn.execute("UPDATE examples SET created_at = ?, use_count = 2", (ten_days_ago,))
+    store.conn.commit()
+
+    asyncio.run(store.add_example("new", "SELECT 3", [1.0, 1.0], 0.1, "v1"))
+
+    assert "new" in stored_questions(store)
+    assert len(stored_questions(store)) == 2
+
+
+def test_examples_expire_by_age_even_when_used(make_store):
+    store = make_store(example_max_age_days=30)
+    asyncio.run(store.add_example("old", "SELECT 1", [1.0, 0.0], 0.1, "v1"))
+    store.conn.execute("UPDATE examples SET created_at = ?", (time.time() - 31 * 86400,))
+    store.conn.commit()
+    assert asyncio.run(store.find_similar_examples([1.0, 0.0], "v1"))
+
+    asyncio.run(store.add_example("new", "SELECT 2", [0.0, 1.0], 0.1, "v1"))
+
+    assert stored_questions(store) == {"new"}
+
+
+def test_index_follows_a_new_embedding_dimension(make_store):
+    store = make_store()
+    asyncio.run(store.add_example("four dims", "SELECT 1", [1.0, 0.0, 0.0, 0.0], 0.1, "v1"))
+    asyncio.run(store.remove_other_schema_versions("v2"))
+    assert store._matrix is None
+
+    asyncio.run(store.add_example("two dims", "SELECT 2", [1.0, 0.0], 0.1, "v2"))
+
+    examples = asyncio.run(store.find_similar_examples([1.0, 0.0], "v2"))
+    assert [example.question for example in examples] == ["two dims"]
+
+
+def test_rows_from_another_embedding_model_are_left_out(make_store):
+    store = make_store()
+    asyncio.run(store.add_example("four dims", "SELECT 1", [1.0, 0.0, 0.0, 0.0], 0.1, "v1"))
+    asyncio.run(store.add_example("two dims", "SELECT 2", [1.0, 0.0], 0.1, "v1"))
+
+    examples = asyncio.run(store.find_similar_examples([1.0, 0.0], "v1"))
+    assert [example.question for example in examples] == ["two dims"]
+    assert len(store._ids) == 1
+
+
+def test_rows_written_by_another_worker_are_picked_up(make_store):
+    store = make_store()
+    other_worker = ExampleStoreService()
+    asyncio.run(store.add_example("q", "SELECT 1", [1.0, 0.0], 0.1, "v1"))
+
+    example = asyncio.run(other_worker.find_exact_match("q", [1.0, 0.0], "v1"))
+    assert example.sql == "SELECT 1"
+
+    asyncio.run(store.add_example("q", "SELECT 2", [1.0, 0.0], 0.1, "v1"))
+    example = asyncio.run(other_worker.find_exact_match("q", [1.0, 0.0], "v1"))
+    assert example.sql == "SELECT 2"
+    assert len(other_worker._ids) == 1
+
+
+def test_json_embeddings_are_migrated_to_blobs(make_store):
+    store = make_store()
+    now = time.time()
+    store.conn.execute(
+        """
+        INSERT INTO examples (question, sql, embedding, execution_time, schema_version, created_at, last_used_at)
+        VALUES ('legacy', 'SELECT 1', '[1.0, 0.0]', 0.1, 'v1', ?, ?)
+        """,
+        (now, now)
+    )
+    store.conn.commit()
+
+    migrated = ExampleStoreService()
+
+    assert migrated.conn.execute("SELECT typeof(embedding) FROM examples").fetchone() == ("blob",)
+    examples = asyncio.run(migrated.find_similar_examples([1.0, 0.0], "v1"))
+    assert [example.question for example in examples] == ["legacy"]
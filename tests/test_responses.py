@@ -0,0 +1,86 @@
+import datetime
+import decimal
+import ipaddress
+import json
+import uuid
+import pytest
+from src.api import responses
+from src.api.responses import encode_json
+from src.models.api_models import QueryResponse
+
+UTC = datetime.timezone.utc
+TZ_PLUS_2 = datetime.timezone(datetime.timedelta(hours=2))
+TZ_MINUS_0530 = datetime.timezone(-datetime.timedelta(hours=5, minutes=30))
+
+POSTGRES_VALUES = [
+    decimal.Decimal("12345.67"),
+    decimal.Decimal("-0.000100"),
+    datetime.date(2020, 1, 5),
+    datetime.datetime(2020, 1, 5, 10, 30),
+    datetime.datetime(2020, 1, 5, 10, 30, 15, 120000, tzinfo=UTC),
+    datetime.datetime(2020, 1, 5, 10, 30, tzinfo=TZ_PLUS_2),
+    datetime.datetime(2020, 1, 5, 10, 30, tzinfo=TZ_MINUS_0530),
+    datetime.time(10, 30, 15),
+    datetime.time(10, 30, tzinfo=UTC),
+    datetime.timedelta(0),
+    datetime.timedelta(seconds=90),
+    datetime.timedelta(days=3, hours=4, minutes=5, seconds=6),
+    datetime.timedelta(days=2),
+    datetime.timedelta(hours=1, microseconds=500),
+    datetime.timedelta(seconds=1, microseconds=250000),
+    -datetime.timedelta(hours=1, minutes=30),
+    -datetime.timedelta(days=1, seconds=1),
+    uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    ipaddress.IPv4Address("10.0.0.1"),
+    ipaddress.IPv6Network("2001:db8::/32"),
+    b"raw bytes",
+    None,
+    True,
+    1.5,
+]
+
+
+def pydantic_json(rows):
+    response = QueryResponse(
+        question="q", sql_query="SELECT 1", sql_parameters=None, results=rows,
+        relevant_schema="schema", confidence_score=0.9, mlflow_run_id="run"
+    )
+    return json.loads(response.model_dump_json())
+
+
+def fast_json(rows):
+    response = QueryResponse.model_construct(
+        question="q", sql_query="SELECT 1", sql_parameters=None, results=rows,
+        relevant_schema="schema", confidence_score=0.9, mlflow_run_id="run"
+    )
+    return json.loads(encode_json(dict(response)))
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param and not responses.ORJSON_AVAILABLE:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(responses, "ORJSON_AVAILABLE", request.param)
+
+
+@pytest.mark.parametrize("value", POSTGRES_VALUES, ids=repr)
+def test_encode_json_matches_pydantic(encoder, value):
+    rows = [{"value": value}]
+    assert fast_json(rows) == pydantic_json(rows)
+
+
+def test_encode_json_matches_pydantic_for_mixed_rows(encoder):
+    rows = [{f"col_{i}": value for i, value in enumerate(POSTGRES_VALUES)} for _ in range(3)]
+    assert fast_json(rows) == pydantic_json(rows)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (datetime.timedelta(0), "PT0S"),
+    (datetime.timedelta(seconds=90), "PT1M30S"),
+    (datetime.timedelta(days=2), "P2D"),
+    (datetime.timedelta(days=3, hours=4, minutes=5, seconds=6), "P3DT4H5M6S"),
+    (datetime.timedelta(seconds=1, microseconds=250000), "PT1.25S"),
+    (-datetime.timedelta(hours=1, minutes=30), "-PT1H30M"),
+])
+def test_iso_duration(value, expected):
+    assert responses._iso_duration(value) == expected
@@ -0,0 +1,83 @@
+import os
+import numpy as np
+from src.models.database_models import SchemaSnapshot, SchemaTable
+from src.services.shared_index_service import (
+    CURRENT_FILE, KEEP_GENERATIONS, load_snapshot, publish_snapshot, read_current_generation
+)
+
+
+def make_snapshot(version: str, embedding_value: float = 0.5) -> SchemaSnapshot:
+    tables = {
+        "countries": SchemaTable(
+            name="countries",
+            columns={"id": "INTEGER", "name": "VARCHAR(100)"},
+            primary_keys=["id"],
+            foreign_keys=[],
+            description="Table 'countries' with columns: id (INTEGER), name (VARCHAR(100))",
+            semantic_description="Countries of the world"
+        ),
+        "economy": SchemaTable(
+            name="economy",
+            columns={"country_id": "INTEGER", "year": "INTEGER", "gdp": "NUMERIC"},
+            primary_keys=["country_id", "year"],
+            foreign_keys=[{"constrained_columns": ["country_id"], "referred_table": "countries",
+                           "referred_columns": ["id"]}],
+            description="Table 'economy' with columns: country_id (INTEGER), year (INTEGER), gdp (NUMERIC)",
+            semantic_description="Yearly GDP per country"
+        ),
+    }
+    embeddings = {
+        f"{table}_{kind}": [embedding_value, -embedding_value, float(i)]
+        for i, (table, kind) in enumerate((t, k) for t in tables for k in ("technical", "semantic"))
+    }
+    return SchemaSnapshot(version=version, tables=tables, embeddings=embeddings)
+
+
+def generation_dirs(index_dir) -> list:
+    return sorted(entry for entry in os.listdir(index_dir) if os.path.isdir(os.path.join(index_dir, entry)))
+
+
+def test_publish_and_load_round_trip(tmp_path):
+    snapshot = make_snapshot("v1")
+
+    generation = publish_snapshot(str(tmp_path), snapshot)
+
+    assert read_current_generation(str(tmp_path)) == generation
+    loaded = load_snapshot(str(tmp_path), generation)
+    assert loaded.version == "v1"
+    assert loaded.tables == snapshot.tables
+    assert set(loaded.embeddings) == set(snapshot.embeddings)
+    for key, embedding in snapshot.embeddings.items():
+        assert loaded.embeddings[key].dtype == np.float32
+        np.testing.assert_allclose(loaded.embeddings[key], embedding)
+
+
+def test_loaded_embeddings_are_memory_mapped_read_only(tmp_path):
+    generation = publish_snapshot(str(tmp_path), make_snapshot("v1"))
+
+    embedding = load_snapshot(str(tmp_path), generation).embeddings["countries_technical"]
+
+    assert isinstance(embedding.base, np.memmap)
+    assert not embedding.flags.writeable
+
+
+def test_snapshot_without_embeddings_round_trips(tmp_path):
+    snapshot = SchemaSnapshot(version="v1", tables=make_snapshot("v1").tables, embeddings={})
+
+    loaded = load_snapshot(str(tmp_path), publish_snapshot(str(tmp_path), snapshot))
+
+    assert loaded.embeddings == {}
+    assert loaded.tables == snapshot.tables
+
+
+def test_no_current_generation_before_the_first_publish(tmp_path):
+    assert read_current_generation(str(tmp_path)) is None
+
+
+def test_only_the_latest_generations_are_kept(tmp_path):
+    generations = [publish_snapshot(str(tmp_path), make_snapshot(f"v{i}", i)) for i in range(KEEP_GENERATIONS + 3)]
+
+    assert generation_dirs(tmp_path) == sorted(generations[-KEEP_GENERATIONS:])
+    assert read_current_generation(str(tmp_path)) == generations[-1]
+    assert load_snapshot(str(tmp_path), generations[-1]).version == f"v{KEEP_GENERATIONS + 2}"
+    assert not [entry for entry in os.listdir(tmp_path) if entry.startswith(f"{CURRENT_FILE}.")]
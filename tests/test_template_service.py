@@ -0,0 +1,144 @@
+import datetime
+import decimal
+from src.services.template_service import TemplateService
+
+template_service = TemplateService()
+
+
+def typed_template(sql, literals, parameter_types):
+    template = template_service.build_template(sql, literals, "schema", 0.9)
+    return template_service.with_parameter_types(template, parameter_types)
+
+
+def test_extract_literals_numbers_and_names():
+    skeleton, literals = template_service.extract_literals("What was the GDP of France in 2010?")
+    assert literals == ["France", "2010"]
+    assert skeleton == "what was the gdp of <str> in <num>"
+
+
+def test_extract_literals_skips_capitalised_first_word():
+    _, literals = template_service.extract_literals("Show films longer than 120 minutes")
+    assert literals == ["120"]
+
+
+def test_extract_literals_keeps_dates_whole():
+    skeleton, literals = template_service.extract_literals("How many orders were placed on 2020-01-05?")
+    assert literals == ["2020-01-05"]
+    assert skeleton == "how many orders were placed on <date>"
+
+
+def test_extract_literals_same_skeleton_for_different_values():
+    first, _ = template_service.extract_literals("GDP of France in 2010")
+    second, _ = template_service.extract_literals("GDP of Spain in 2015")
+    assert first == second
+
+
+def test_build_template_binds_literals_in_order_of_use():
+    template = template_service.build_template(
+        "SELECT gdp FROM economy WHERE year = 2010 AND country = 'France'", ["France", "2010"], "schema", 0.9
+    )
+    assert template.sql == "SELECT gdp FROM economy WHERE year = $1 AND country = $2"
+    assert template.parameter_slots == [1, 0]
+
+
+def test_build_template_reuses_parameter_for_repeated_literal_in_sql():
+    template = template_service.build_template(
+        "SELECT * FROM sales WHERE year = 2010 OR prior_year = 2010", ["2010"], "schema", 0.9
+    )
+    assert template.sql == "SELECT * FROM sales WHERE year = $1 OR prior_year = $1"
+    assert template.parameter_slots == [0]
+
+
+def test_build_template_rejects_duplicate_literals():
+    assert template_service.build_template(
+        "SELECT * FROM trips WHERE start_year = 2010 AND end_year = 2010", ["2010", "2010"], "schema", 0.9
+    ) is None
+
+
+def test_build_template_rejects_like_patterns():
+    assert template_service.build_template(
+        "SELECT * FROM countries WHERE name LIKE '%France%'", ["France"], "schema", 0.9
+    ) is None
+
+
+def test_build_template_rejects_unbound_literals():
+    assert template_service.build_template(
+        "SELECT * FROM films WHERE release_year > 2000", ["2010"], "schema", 0.9
+    ) is None
+
+
+def test_build_template_leaves_quoted_identifiers_alone():
+    # "2010" is a column name here, so the literal stays unbound
+    template = template_service.build_template(
+        'SELECT "2010" FROM totals WHERE region = \'Europe\'', ["Europe", "2010"], "schema", 0.9
+    )
+    assert template is None
+
+
+def test_build_template_quoted_number():
+    template = template_service.build_template(
+        "SELECT * FROM films WHERE year = '2010'", ["2010"], "schema", 0.9
+    )
+    assert template.sql == "SELECT * FROM films WHERE year = $1"
+
+
+def test_build_template_date_literals():
+    template = template_service.build_template(
+        "SELECT count(*) FROM orders WHERE order_date = '2020-01-05'", ["2020-01-05"], "schema", 0.9
+    )
+    assert template.sql == "SELECT count(*) FROM orders WHERE order_date = $1"
+
+    typed = template_service.build_template(
+        "SELECT count(*) FROM orders WHERE order_date >= DATE '2020-01-05'", ["2020-01-05"], "schema", 0.9
+    )
+    assert typed.sql == "SELECT count(*) FROM orders WHERE order_date >= $1::date"
+
+
+def test_with_parameter_types_rejects_unsupported_types():
+    template = template_service.build_template("SELECT * FROM films WHERE year = 2010", ["2010"], "schema", 0.9)
+    assert template_service.with_parameter_types(template, ["int4"]).parameter_types == ["int4"]
+    assert template_service.with_parameter_types(template, ["jsonb"]) is None
+    assert template_service.with_parameter_types(template, []) is None
+
+
+def test_bind_parameters_coerces_to_prepared_types():
+    template = typed_template(
+        "SELECT gdp FROM economy WHERE year = 2010 AND country = 'France'", ["France", "2010"], ["int4", "text"]
+    )
+    assert template_service.bind_parameters(template, ["Spain", "2015"]) == [2015, "Spain"]
+
+
+def test_bind_parameters_quoted_number_binds_as_column_type():
+    # year = '2010' prepares as an int4 parameter, so it has to be bound as an int
+    template = typed_template("SELECT * FROM films WHERE year = '2010'", ["2010"], ["int4"])
+    assert template_service.bind_parameters(template, ["2011"]) == [2011]
+
+
+def test_bind_parameters_numeric_and_text_from_numbers():
+    template = typed_template("SELECT * FROM products WHERE price > 9.99", ["9.99"], ["numeric"])
+    assert template_service.bind_parameters(template, ["19.50"]) == [decimal.Decimal("19.50")]
+
+    template = typed_template("SELECT * FROM stores WHERE zip_code = '2010'", ["2010"], ["text"])
+    assert template_service.bind_parameters(template, ["3000"]) == ["3000"]
+
+
+def test_bind_parameters_dates():
+    template = typed_template(
+        "SELECT count(*) FROM orders WHERE order_date = '2020-01-05'", ["2020-01-05"], ["date"]
+    )
+    assert template_service.bind_parameters(template, ["2021-03-14"]) == [datetime.date(2021, 3, 14)]
+
+
+def test_bind_parameters_rejects_literals_that_dont_fit():
+    template = typed_template("SELECT * FROM films WHERE year = 2010", ["2010"], ["int4"])
+    assert template_service.bind_parameters(template, ["France"]) is None
+    assert template_service.bind_parameters(template, ["2010", "2011"]) is None
+
+    template = typed_template("SELECT * FROM orders WHERE order_date = '2020-01-05'", ["2020-01-05"], ["date"])
+    assert template_service.bind_parameters(template, ["2021-13-40"]) is None
+
+
+def test_bind_parameters_rejects_untyped_templates():
+    # Templates cached before the types came from prepare
+    template = template_service.build_template("SELECT * FROM films WHERE year = 2010", ["2010"], "schema", 0.9)
+    assert template_service.bind_parameters(template, ["2011"]) is None